@@ -1,511 +1,4119 @@
-#!/usr/bin/env python3
-"""
-Ferramenta para consulta de informações patrimoniais em fontes públicas
-Autor: Cyberrobot
-Versão: 2.0 - Integração com múltiplas fontes governamentais
-"""
-
-import requests
-import json
-import time
-import argparse
-import sys
-from datetime import datetime
-import csv
-from typing import Dict, List, Optional
-import re
-from urllib.parse import urlencode
-
-
-class MrHolmesCorp:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-
-        # URLs das fontes de dados
-        self.urls = {
-            'caixa_programas': 'https://www.caixa.gov.br/programas-sociais/Paginas/default.aspx',
-            'caixa_beneficios': 'https://www.beneficiossociais.caixa.gov.br/consulta/beneficio/04.01.00-00_00.asp',
-            'auxilio_emergencial': 'https://consultaauxilio.cidadania.gov.br/consulta/#/',
-            'receita_cnpj': 'http://www.receita.fazenda.gov.br/PessoaJuridica/CNPJ/cnpjreva/Cnpjreva_Solicitacao.asp',
-            'bcb_valores': 'https://valoresareceber.bcb.gov.br/publico/',
-            'bcb_api': 'https://valoresareceber.bcb.gov.br/publico/rest/valoresAReceber/',
-            'omnisci_demo': 'https://www.omnisci.com/demos/tweetmap',
-            'scan_user_repo': 'https://github.com/faciltech/scan-user',
-            'osint_brasil_repo': 'https://github.com/felipeluan20/OSINTKit-Brasil',
-            'dados_gov': 'https://dados.gov.br/home',
-            'brasil_io': 'https://brasil.io/datasets/',
-            'ibict_dados': 'https://dados.ibict.br/dataset',
-            'bcb_dados': 'https://dadosabertos.bcb.gov.br/dataset',
-            'turismo_dados': 'https://dados.turismo.gov.br/dataset/',
-            'mj_dados': 'https://dados.mj.gov.br/dataset',
-            'sc_dados': 'https://dados.sc.gov.br/',
-            'sp_policia_rg': 'https://www.policiacivil.sp.gov.br/portal/faces/pages_home/servicos/consultaSituacaoRG',
-            'sp_transparencia': 'https://www.transparencia.sp.gov.br/home/servidor',
-            'receita_cnpj_oficial': 'https://solucoes.receita.fazenda.gov.br/servicos/cnpjreva/cnpjreva_solicitacao.asp',
-            'receita_cpf': 'https://servicos.receita.fazenda.gov.br/Servicos/CPF/ConsultaSituacao/ConsultaPublica.asp',
-            'sinesp_cidadao': 'https://www.gov.br/pt-br/apps/sinesp-cidadao',
-            'falecidos_brasil': 'https://www.falecidosnobrasil.org.br/index.php',
-            'pessoa_desaparecida': 'https://www.gov.br/pt-br/servicos/consultar-pessoa-desaparecida',
-            'portal_transparencia': 'https://portaldatransparencia.gov.br/',
-            'juntas_comerciais': 'https://www.gov.br/empresas-e-negocios/pt-br/drei/juntas-comerciais',
-            'bcb_oficial': 'https://www.bcb.gov.br/',
-            'detran_pr': 'https://www.detran.pr.gov.br/',
-            'procon_pr': 'https://www.procon.pr.gov.br/'
-        }
-
-    def consultar_cnpj_receitaws(self, cnpj: str) -> Dict:
-        """
-        Consulta informações de empresa via CNPJ na ReceitaWS (API pública)
-        """
-        cnpj_limpo = ''.join(filter(str.isdigit, cnpj))
-
-        if len(cnpj_limpo) != 14:
-            return {"erro": "CNPJ deve ter 14 dígitos"}
-
-        url = f"https://www.receitaws.com.br/v1/cnpj/{cnpj_limpo}"
-
-        try:
-            response = self.session.get(url, timeout=30)
-            data = response.json()
-
-            if response.status_code == 200 and data.get('status') == 'OK':
-                return {
-                    "fonte": "ReceitaWS",
-                    "cnpj": data.get('cnpj'),
-                    "razao_social": data.get('nome'),
-                    "nome_fantasia": data.get('fantasia'),
-                    "situacao": data.get('situacao'),
-                    "capital_social": data.get('capital_social'),
-                    "endereco": {
-                        "logradouro": data.get('logradouro'),
-                        "numero": data.get('numero'),
-                        "bairro": data.get('bairro'),
-                        "municipio": data.get('municipio'),
-                        "uf": data.get('uf'),
-                        "cep": data.get('cep')
-                    },
-                    "atividade_principal": data.get('atividade_principal', []),
-                    "atividades_secundarias": data.get('atividades_secundarias', []),
-                    "socios": data.get('qsa', []),
-                    "url_fonte": url
-                }
-            else:
-                return {"erro": data.get('message', 'Erro na consulta'), "url_fonte": url}
-
-        except Exception as e:
-            return {"erro": f"Erro na requisição: {str(e)}", "url_fonte": url}
-
-    def consultar_valores_receber_bcb(self, cpf_cnpj: str) -> Dict:
-        """
-        Consulta valores a receber no Banco Central
-        """
-        documento_limpo = ''.join(filter(str.isdigit, cpf_cnpj))
-
-        # Formato da API do BCB para valores a receber
-        url = f"{self.urls['bcb_api']}{documento_limpo}/1960-12-01"
-
-        try:
-            response = self.session.get(url, timeout=30)
-
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                    return {
-                        "fonte": "Banco Central - Valores a Receber",
-                        "documento": documento_limpo,
-                        "valores": data,
-                        "url_fonte": url,
-                        "url_portal": self.urls['bcb_valores']
-                    }
-                except:
-                    return {
-                        "fonte": "Banco Central - Valores a Receber",
-                        "documento": documento_limpo,
-                        "status": "Resposta recebida mas não é JSON válido",
-                        "url_fonte": url,
-                        "url_portal": self.urls['bcb_valores']
-                    }
-            else:
-                return {
-                    "erro": f"Status HTTP: {response.status_code}",
-                    "url_fonte": url,
-                    "url_portal": self.urls['bcb_valores']
-                }
-
-        except Exception as e:
-            return {
-                "erro": f"Erro na requisição: {str(e)}",
-                "url_fonte": url,
-                "url_portal": self.urls['bcb_valores']
-            }
-
-    def consultar_portal_transparencia(self, termo: str, tipo: str = "pessoa") -> Dict:
-        """
-        Consulta no Portal da Transparência
-        """
-        try:
-            # Simulação de consulta - implementar com APIs reais quando disponíveis
-            return {
-                "fonte": "Portal da Transparência",
-                "termo_busca": termo,
-                "tipo": tipo,
-                "status": "Consulta estruturada - implementar com API oficial",
-                "url_portal": self.urls['portal_transparencia'],
-                "observacao": "Acessar manualmente o portal para consultas específicas"
-            }
-        except Exception as e:
-            return {
-                "erro": f"Erro na consulta: {str(e)}",
-                "url_portal": self.urls['portal_transparencia']
-            }
-
-    def consultar_caixa_beneficios(self, cpf: str) -> Dict:
-        """
-        Estrutura para consulta de benefícios sociais da Caixa
-        """
-        cpf_limpo = ''.join(filter(str.isdigit, cpf))
-
-        return {
-            "fonte": "Caixa Econômica Federal - Benefícios Sociais",
-            "cpf": cpf_limpo,
-            "status": "Consulta manual necessária",
-            "url_programas": self.urls['caixa_programas'],
-            "url_beneficios": self.urls['caixa_beneficios'],
-            "observacao": "Acessar os portais da Caixa para consulta manual"
-        }
-
-    def consultar_auxilio_emergencial(self, cpf: str) -> Dict:
-        """
-        Estrutura para consulta do auxílio emergencial
-        """
-        cpf_limpo = ''.join(filter(str.isdigit, cpf))
-
-        return {
-            "fonte": "Auxílio Emergencial - Ministério da Cidadania",
-            "cpf": cpf_limpo,
-            "status": "Consulta manual necessária",
-            "url_consulta": self.urls['auxilio_emergencial'],
-            "observacao": "Acessar o portal para consulta manual do auxílio"
-        }
-
-    def consultar_receita_federal(self, documento: str, tipo: str) -> Dict:
-        """
-        Estrutura para consultas na Receita Federal
-        """
-        documento_limpo = ''.join(filter(str.isdigit, documento))
-
-        if tipo == "cnpj":
-            url_consulta = self.urls['receita_cnpj_oficial']
-        else:
-            url_consulta = self.urls['receita_cpf']
-
-        return {
-            "fonte": "Receita Federal do Brasil",
-            "documento": documento_limpo,
-            "tipo": tipo,
-            "status": "Consulta manual necessária",
-            "url_consulta": url_consulta,
-            "observacao": "Acessar o portal da Receita Federal para consulta oficial"
-        }
-
-    def consultar_sp_policia_rg(self, rg: str) -> Dict:
-        """
-        Estrutura para consulta de RG na Polícia Civil de SP
-        """
-        return {
-            "fonte": "Polícia Civil de São Paulo",
-            "rg": rg,
-            "status": "Consulta manual necessária",
-            "url_consulta": self.urls['sp_policia_rg'],
-            "observacao": "Acessar o portal da Polícia Civil de SP para consulta do RG"
-        }
-
-    def consultar_sp_transparencia(self, nome: str) -> Dict:
-        """
-        Estrutura para consulta de servidores públicos de SP
-        """
-        return {
-            "fonte": "Transparência São Paulo - Servidores",
-            "nome": nome,
-            "status": "Consulta manual necessária",
-            "url_consulta": self.urls['sp_transparencia'],
-            "observacao": "Acessar o portal para consulta de servidores públicos de SP"
-        }
-
-    def consultar_sinesp_cidadao(self, placa: str = None) -> Dict:
-        """
-        Estrutura para consulta no SINESP Cidadão
-        """
-        return {
-            "fonte": "SINESP Cidadão",
-            "placa": placa,
-            "status": "Aplicativo necessário",
-            "url_info": self.urls['sinesp_cidadao'],
-            "observacao": "Baixar o aplicativo SINESP Cidadão para consultas"
-        }
-
-    def consultar_falecidos_brasil(self, nome: str) -> Dict:
-        """
-        Estrutura para consulta de falecidos no Brasil
-        """
-        return {
-            "fonte": "Falecidos no Brasil",
-            "nome": nome,
-            "status": "Consulta manual necessária",
-            "url_consulta": self.urls['falecidos_brasil'],
-            "observacao": "Acessar o site para consulta de registros de óbito"
-        }
-
-    def consultar_pessoa_desaparecida(self, nome: str) -> Dict:
-        """
-        Estrutura para consulta de pessoas desaparecidas
-        """
-        return {
-            "fonte": "Consulta Pessoa Desaparecida - Gov.br",
-            "nome": nome,
-            "status": "Consulta manual necessária",
-            "url_consulta": self.urls['pessoa_desaparecida'],
-            "observacao": "Acessar o portal gov.br para consulta de pessoas desaparecidas"
-        }
-
-    def consultar_detran_pr(self, info: str) -> Dict:
-        """
-        Estrutura para consultas no DETRAN-PR
-        """
-        return {
-            "fonte": "DETRAN Paraná",
-            "info": info,
-            "status": "Consulta manual necessária",
-            "url_consulta": self.urls['detran_pr'],
-            "observacao": "Acessar o portal do DETRAN-PR para consultas veiculares"
-        }
-
-    def consultar_procon_pr(self, empresa: str) -> Dict:
-        """
-        Estrutura para consultas no PROCON-PR
-        """
-        return {
-            "fonte": "PROCON Paraná",
-            "empresa": empresa,
-            "status": "Consulta manual necessária",
-            "url_consulta": self.urls['procon_pr'],
-            "observacao": "Acessar o portal do PROCON-PR para consultas sobre reclamações"
-        }
-
-    def listar_fontes_dados_abertos(self) -> Dict:
-        """
-        Lista todas as fontes de dados abertos disponíveis
-        """
-        fontes_dados = {
-            "dados_gov": {
-                "nome": "Dados.gov.br",
-                "url": self.urls['dados_gov'],
-                "descricao": "Portal oficial de dados abertos do governo federal"
-            },
-            "brasil_io": {
-                "nome": "Brasil.io",
-                "url": self.urls['brasil_io'],
-                "descricao": "Datasets organizados sobre o Brasil"
-            },
-            "ibict_dados": {
-                "nome": "IBICT Dados",
-                "url": self.urls['ibict_dados'],
-                "descricao": "Instituto Brasileiro de Informação em Ciência e Tecnologia"
-            },
-            "bcb_dados": {
-                "nome": "BCB Dados Abertos",
-                "url": self.urls['bcb_dados'],
-                "descricao": "Dados abertos do Banco Central do Brasil"
-            },
-            "turismo_dados": {
-                "nome": "Dados Turismo",
-                "url": self.urls['turismo_dados'],
-                "descricao": "Dados do Ministério do Turismo"
-            },
-            "mj_dados": {
-                "nome": "Dados MJ",
-                "url": self.urls['mj_dados'],
-                "descricao": "Dados do Ministério da Justiça"
-            },
-            "sc_dados": {
-                "nome": "Dados SC",
-                "url": self.urls['sc_dados'],
-                "descricao": "Dados abertos do estado de Santa Catarina"
-            }
-        }
-
-        return {
-            "fonte": "Repositórios de Dados Abertos",
-            "fontes_disponiveis": fontes_dados,
-            "total_fontes": len(fontes_dados)
-        }
-
-    def listar_ferramentas_osint(self) -> Dict:
-        """
-        Lista ferramentas OSINT disponíveis
-        """
-        ferramentas = {
-            "scan_user": {
-                "nome": "Scan User",
-                "url": self.urls['scan_user_repo'],
-                "descricao": "Ferramenta para scan de usuários"
-            },
-            "osint_brasil": {
-                "nome": "OSINT Kit Brasil",
-                "url": self.urls['osint_brasil_repo'],
-                "descricao": "Kit de ferramentas OSINT focado no Brasil"
-            },
-            "omnisci_demo": {
-                "nome": "OmniSci Tweet Map",
-                "url": self.urls['omnisci_demo'],
-                "descricao": "Demo de visualização de dados de tweets"
-            }
-        }
-
-        return {
-            "fonte": "Ferramentas OSINT",
-            "ferramentas_disponiveis": ferramentas,
-            "total_ferramentas": len(ferramentas)
-        }
-
-    def gerar_relatorio(self, dados: Dict, arquivo: str = None) -> None:
-        """
-        Gera relatório das consultas realizadas
-        """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-        if not arquivo:
-            arquivo = f"relatorio_mr_holmescorp_{timestamp}.json"
-
-        with open(arquivo, 'w', encoding='utf-8') as f:
-            json.dump(dados, f, ensure_ascii=False, indent=2)
-
-        print(f"[INFO] Relatório salvo em: {arquivo}")
-
-    def buscar_completa(self, identificador: str, tipo: str) -> Dict:
-        """
-        Realiza busca completa em todas as fontes disponíveis
-        """
-        resultados = {
-            "identificador": identificador,
-            "tipo": tipo,
-            "timestamp": datetime.now().isoformat(),
-            "fontes": {},
-            "urls_referencias": self.urls
-        }
-
-        print(f"[INFO] Iniciando busca completa para {tipo}: {identificador}")
-
-        if tipo == "cnpj":
-            print("[INFO] Consultando CNPJ via ReceitaWS...")
-            resultados["fontes"]["receitaws"] = self.consultar_cnpj_receitaws(identificador)
-
-            print("[INFO] Consultando Receita Federal oficial...")
-            resultados["fontes"]["receita_federal"] = self.consultar_receita_federal(identificador, "cnpj")
-
-            print("[INFO] Consultando valores a receber BCB...")
-            resultados["fontes"]["bcb_valores"] = self.consultar_valores_receber_bcb(identificador)
-
-            print("[INFO] Consultando Portal da Transparência...")
-            resultados["fontes"]["transparencia"] = self.consultar_portal_transparencia(identificador, "empresa")
-
-        elif tipo == "cpf":
-            print("[INFO] Consultando Receita Federal...")
-            resultados["fontes"]["receita_federal"] = self.consultar_receita_federal(identificador, "cpf")
-
-            print("[INFO] Consultando valores a receber BCB...")
-            resultados["fontes"]["bcb_valores"] = self.consultar_valores_receber_bcb(identificador)
-
-            print("[INFO] Consultando benefícios Caixa...")
-            resultados["fontes"]["caixa_beneficios"] = self.consultar_caixa_beneficios(identificador)
-
-            print("[INFO] Consultando auxílio emergencial...")
-            resultados["fontes"]["auxilio_emergencial"] = self.consultar_auxilio_emergencial(identificador)
-
-            print("[INFO] Consultando Portal da Transparência...")
-            resultados["fontes"]["transparencia"] = self.consultar_portal_transparencia(identificador, "pessoa")
-
-        elif tipo == "nome":
-            print("[INFO] Consultando transparência SP...")
-            resultados["fontes"]["sp_transparencia"] = self.consultar_sp_transparencia(identificador)
-
-            print("[INFO] Consultando falecidos Brasil...")
-            resultados["fontes"]["falecidos"] = self.consultar_falecidos_brasil(identificador)
-
-            print("[INFO] Consultando pessoa desaparecida...")
-            resultados["fontes"]["pessoa_desaparecida"] = self.consultar_pessoa_desaparecida(identificador)
-
-        elif tipo == "rg":
-            print("[INFO] Consultando RG SP...")
-            resultados["fontes"]["sp_policia_rg"] = self.consultar_sp_policia_rg(identificador)
-
-        elif tipo == "placa":
-            print("[INFO] Consultando SINESP...")
-            resultados["fontes"]["sinesp"] = self.consultar_sinesp_cidadao(identificador)
-
-            print("[INFO] Consultando DETRAN-PR...")
-            resultados["fontes"]["detran_pr"] = self.consultar_detran_pr(identificador)
-
-        # Adicionar informações sobre fontes de dados abertos
-        print("[INFO] Listando fontes de dados abertos...")
-        resultados["fontes"]["dados_abertos"] = self.listar_fontes_dados_abertos()
-
-        print("[INFO] Listando ferramentas OSINT...")
-        resultados["fontes"]["ferramentas_osint"] = self.listar_ferramentas_osint()
-
-        return resultados
-
-
-def main():
-    parser = argparse.ArgumentParser(description='Mr.HolmesCorp - Consultor de Informações em Fontes Públicas v2.0')
-    parser.add_argument('identificador', help='CNPJ, CPF, Nome, RG ou Placa para consulta')
-    parser.add_argument('--tipo', choices=['cnpj', 'cpf', 'nome', 'rg', 'placa'], required=True,
-                        help='Tipo de consulta (cnpj, cpf, nome, rg, placa)')
-    parser.add_argument('--output', '-o', help='Arquivo de saída para o relatório')
-    parser.add_argument('--verbose', '-v', action='store_true', help='Modo verboso')
-    parser.add_argument('--listar-fontes', action='store_true', help='Listar todas as fontes disponíveis')
-
-    args = parser.parse_args()
-
-    consultor = MrHolmesCorpConsultor()
-
-    print("=" * 80)
-    print("MR.HOLMESCORP - CONSULTOR DE INFORMAÇÕES PÚBLICAS v2.0")
-    print("Integração com múltiplas fontes governamentais")
-    print("=" * 80)
-
-    if args.listar_fontes:
-        print("\n[FONTES DISPONÍVEIS]")
-        for nome, url in consultor.urls.items():
-            print(f"- {nome}: {url}")
-        return
-
-    try:
-        resultados = consultor.buscar_completa(args.identificador, args.tipo)
-
-        if args.verbose:
-            print("\n[RESULTADOS DETALHADOS]")
-            print(json.dumps(resultados, ensure_ascii=False, indent=2))
-        else:
-            print("\n[RESUMO DOS RESULTADOS]")
-            for fonte, dados in resultados["fontes"].items():
-                print(f"- {fonte}: {dados.get('status', 'Consultado')}")
-
-        # Salvar relatório
-        consultor.gerar_relatorio(resultados, args.output)
-
-        print(f"\n[CONCLUÍDO] Consulta finalizada com sucesso!")
-        print(f"Total de fontes consultadas: {len(resultados['fontes'])}")
-
-    except KeyboardInterrupt:
-        print("\n[INTERROMPIDO] Consulta cancelada pelo usuário")
-    except Exception as e:
-        print(f"\n[ERRO] Erro durante a execução: {str(e)}")
-        sys.exit(1)
-
-
-if __name__ == "__main__":
-    main()
+#!/usr/bin/env python3
+"""
+Ferramenta para consulta de informações patrimoniais em fontes públicas
+Autor: Cyberrobot
+Versão: 2.0 - Integração com múltiplas fontes governamentais
+"""
+
+# Só módulos leves no topo: requests, asyncio, sqlite3, ssl, cProfile e afins
+# são importados nas funções que os usam, para que consultas apenas a
+# fontes estáticas e --listar-fontes não paguem o custo de importá-los.
+import contextvars
+import struct
+import json
+import time
+import argparse
+import heapq
+import io
+import mmap
+import os
+import queue
+import sys
+from datetime import datetime
+import csv
+import threading
+from collections import OrderedDict, deque
+from collections.abc import Mapping
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple, Union
+import re
+from urllib.parse import urlencode, urlsplit
+
+
+CABECALHOS_PADRAO = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+TIPOS_CONSULTA = ('cnpj', 'cpf', 'nome', 'rg', 'placa')
+
+
+class RespostaHTTP:
+    """
+    Resposta do motor assíncrono, com a mesma interface usada de requests.Response
+    """
+
+    def __init__(self, url: str, status_code: int, headers: Dict[str, str], content: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self) -> str:
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _PoolHost:
+    """
+    Conexões keep-alive ociosas de um host, limitadas por semáforo
+    """
+
+    def __init__(self, limite: int):
+        import asyncio
+        self.semaforo = asyncio.Semaphore(limite)
+        self.ociosas = []
+
+    def obter(self, idade_maxima: float):
+        while self.ociosas:
+            reader, writer, desde = self.ociosas.pop()
+            if time.monotonic() - desde < idade_maxima and not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return None
+
+    def devolver(self, reader, writer) -> None:
+        self.ociosas.append((reader, writer, time.monotonic()))
+
+    def fechar(self) -> None:
+        for _, writer, _ in self.ociosas:
+            writer.close()
+        self.ociosas.clear()
+
+
+class MotorHTTPAssincrono:
+    """
+    Cliente HTTP/1.1 em asyncio puro com pool de conexões keep-alive por host
+
+    Cada host tem no máximo `limite_por_host` conexões simultâneas; as
+    conexões são reaproveitadas em sequência entre requisições, permitindo
+    manter centenas de consultas em andamento sem uma thread por requisição.
+    """
+
+    def __init__(self, limite_por_host: int = 10, timeout: float = 30,
+                 headers: Optional[Dict[str, str]] = None, idade_maxima_ociosa: float = 30,
+                 timeout_conexao: Optional[float] = None):
+        self.limite_por_host = limite_por_host
+        self.timeout = timeout
+        self.timeout_conexao = timeout if timeout_conexao is None else timeout_conexao
+        self.headers = dict(headers or CABECALHOS_PADRAO)
+        self.idade_maxima_ociosa = idade_maxima_ociosa
+        self._pools = {}
+        self._loop = None
+        self._ssl = None
+
+    def _pool(self, chave: Tuple[str, str, int]) -> _PoolHost:
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Conexões e semáforos pertencem ao loop em que foram criados
+            self._pools = {}
+            self._loop = loop
+        pool = self._pools.get(chave)
+        if pool is None:
+            pool = self._pools[chave] = _PoolHost(self.limite_por_host)
+        return pool
+
+    async def _conectar(self, esquema: str, host: str, porta: int):
+        import asyncio
+        contexto = None
+        if esquema == 'https':
+            if self._ssl is None:
+                import ssl
+                self._ssl = ssl.create_default_context()
+            contexto = self._ssl
+        return await asyncio.open_connection(host, porta, ssl=contexto)
+
+    async def _trocar(self, reader, writer, host_header: str, caminho: str) -> Tuple[int, Dict[str, str], bytes, bool]:
+        linhas = [f"GET {caminho} HTTP/1.1", f"Host: {host_header}"]
+        linhas += [f"{nome}: {valor}" for nome, valor in self.headers.items()]
+        linhas += ["Accept: */*", "Accept-Encoding: gzip, deflate", "Connection: keep-alive", "", ""]
+        writer.write("\r\n".join(linhas).encode('latin-1'))
+        await writer.drain()
+
+        linha_status = await reader.readline()
+        if not linha_status:
+            raise ConnectionResetError("Conexão encerrada pelo servidor")
+        partes = linha_status.decode('latin-1').split(None, 2)
+        versao, status = partes[0], int(partes[1])
+
+        headers = {}
+        while True:
+            linha = await reader.readline()
+            if linha in (b'\r\n', b'\n', b''):
+                break
+            nome, _, valor = linha.decode('latin-1').partition(':')
+            headers[nome.strip().lower()] = valor.strip()
+
+        reutilizavel = versao == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+        if status in (204, 304) or 100 <= status < 200:
+            corpo = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            pedacos = []
+            while True:
+                tamanho = int((await reader.readline()).split(b';')[0].strip(), 16)
+                if tamanho == 0:
+                    while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    break
+                pedacos.append(await reader.readexactly(tamanho))
+                await reader.readexactly(2)
+            corpo = b''.join(pedacos)
+        elif 'content-length' in headers:
+            corpo = await reader.readexactly(int(headers['content-length']))
+        else:
+            corpo = await reader.read()
+            reutilizavel = False
+
+        codificacao = headers.get('content-encoding', '').lower()
+        if codificacao == 'gzip':
+            import gzip
+            corpo = gzip.decompress(corpo)
+        elif codificacao == 'deflate':
+            import zlib
+            corpo = zlib.decompress(corpo)
+
+        return status, headers, corpo, reutilizavel
+
+    async def get(self, url: str, timeout: Optional[float] = None,
+                  timeout_conexao: Optional[float] = None) -> RespostaHTTP:
+        """
+        Executa um GET reaproveitando conexões ociosas do host
+
+        `timeout_conexao` limita o estabelecimento da conexão (TCP + TLS) e
+        `timeout` a troca da requisição e leitura da resposta.
+        """
+        import asyncio
+        partes = urlsplit(url)
+        esquema = partes.scheme.lower()
+        porta = partes.port or (443 if esquema == 'https' else 80)
+        host = partes.hostname
+        host_header = host if partes.port is None else f"{host}:{porta}"
+        caminho = (partes.path or '/') + (f"?{partes.query}" if partes.query else '')
+        limite = self.timeout if timeout is None else timeout
+        limite_conexao = self.timeout_conexao if timeout_conexao is None else timeout_conexao
+
+        pool = self._pool((esquema, host, porta))
+        async with pool.semaforo:
+            conexao = pool.obter(self.idade_maxima_ociosa)
+            reaproveitada = conexao is not None
+            while True:
+                if conexao is None:
+                    try:
+                        conexao = await asyncio.wait_for(self._conectar(esquema, host, porta), limite_conexao)
+                    except asyncio.TimeoutError:
+                        raise TimeoutError(f"Tempo limite de {limite_conexao}s excedido ao conectar em {host}") from None
+                reader, writer = conexao
+                try:
+                    status, headers, corpo, reutilizavel = await asyncio.wait_for(
+                        self._trocar(reader, writer, host_header, caminho), limite)
+                except asyncio.TimeoutError:
+                    writer.close()
+                    raise TimeoutError(f"Tempo limite de {limite}s excedido") from None
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reaproveitada:
+                        # Conexão keep-alive fechada pelo servidor enquanto ociosa
+                        conexao, reaproveitada = None, False
+                        continue
+                    raise
+                except BaseException:
+                    writer.close()
+                    raise
+                break
+
+            if reutilizavel:
+                pool.devolver(reader, writer)
+            else:
+                writer.close()
+
+        return RespostaHTTP(url, status, headers, corpo)
+
+    async def fechar(self) -> None:
+        """
+        Fecha todas as conexões ociosas
+        """
+        for pool in self._pools.values():
+            pool.fechar()
+        self._pools = {}
+
+
+def _diretorio_cache_padrao() -> str:
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'mr_holmescorp')
+
+
+class CacheRespostas:
+    """
+    Cache persistente (SQLite) das fontes de rede, por fonte e documento normalizado
+
+    Cada fonte tem seu TTL (padrão: o declarado no registro de fontes); acima
+    de `max_entradas` as entradas acessadas há mais tempo são removidas (LRU).
+    Um nível em memória atende repetições dentro do mesmo processo sem tocar
+    o disco.
+    """
+
+    def __init__(self, arquivo: Optional[str] = None, ttl: Optional[Dict[str, float]] = None,
+                 max_entradas: int = 100000, max_memoria: int = 1024):
+        if arquivo is None:
+            arquivo = os.path.join(_diretorio_cache_padrao(), 'cache.sqlite3')
+        diretorio = os.path.dirname(os.path.abspath(arquivo))
+        os.makedirs(diretorio, exist_ok=True)
+
+        self.arquivo = arquivo
+        self.ttl = {fonte.chave: fonte.ttl for fonte in REGISTRO_FONTES.values() if fonte.ttl}
+        self.ttl.update(ttl or {})
+        self.max_entradas = max_entradas
+        self.max_memoria = max_memoria
+        self.acertos = 0
+        self.falhas = 0
+
+        self._memoria = OrderedDict()
+        self._gravacoes = 0
+        self._lock = threading.Lock()
+        import sqlite3
+        self._conexao = sqlite3.connect(arquivo, check_same_thread=False, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS respostas ("
+            " fonte TEXT NOT NULL, chave TEXT NOT NULL, valor TEXT NOT NULL,"
+            " gravado_em REAL NOT NULL, acessado_em REAL NOT NULL,"
+            " PRIMARY KEY (fonte, chave)) WITHOUT ROWID"
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acesso ON respostas (acessado_em)")
+
+    def obter(self, fonte: str, chave: str) -> Optional[Dict]:
+        """
+        Retorna o resultado armazenado ou None se ausente/expirado
+        """
+        agora = time.time()
+        ttl = self.ttl.get(fonte)
+
+        with self._lock:
+            item = self._memoria.get((fonte, chave))
+            if item is not None and (ttl is None or agora - item[1] <= ttl):
+                valor, gravado_em, acessado_em = item
+                # O acesso também vale para o LRU do disco, senão _despejar remove as entradas mais usadas
+                if agora - acessado_em > 60:
+                    self._registrar_acesso(fonte, chave, agora)
+                    self._memoria[(fonte, chave)] = (valor, gravado_em, agora)
+                self._memoria.move_to_end((fonte, chave))
+                self.acertos += 1
+                return json.loads(valor)
+
+            linha = self._conexao.execute(
+                "SELECT valor, gravado_em, acessado_em FROM respostas WHERE fonte = ? AND chave = ?",
+                (fonte, chave)
+            ).fetchone()
+
+            if linha is None or (ttl is not None and agora - linha[1] > ttl):
+                self._memoria.pop((fonte, chave), None)
+                self.falhas += 1
+                return None
+
+            valor, gravado_em, acessado_em = linha
+            # Atualização de acesso com granularidade de 1 minuto evita uma escrita por acerto
+            if agora - acessado_em > 60:
+                self._registrar_acesso(fonte, chave, agora)
+                acessado_em = agora
+            self._lembrar(fonte, chave, valor, gravado_em, acessado_em)
+            self.acertos += 1
+            return json.loads(valor)
+
+    def _registrar_acesso(self, fonte: str, chave: str, agora: float) -> None:
+        self._conexao.execute(
+            "UPDATE respostas SET acessado_em = ? WHERE fonte = ? AND chave = ?",
+            (agora, fonte, chave)
+        )
+
+    def gravar(self, fonte: str, chave: str, resultado: Dict) -> None:
+        """
+        Armazena um resultado bem-sucedido
+        """
+        valor = json.dumps(resultado, ensure_ascii=False, separators=(',', ':'), default=_serializar_json)
+        agora = time.time()
+
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas (fonte, chave, valor, gravado_em, acessado_em) VALUES (?, ?, ?, ?, ?)",
+                (fonte, chave, valor, agora, agora)
+            )
+            self._lembrar(fonte, chave, valor, agora, agora)
+            self._gravacoes += 1
+            if self._gravacoes % 64 == 0:
+                self._despejar()
+
+    def _lembrar(self, fonte: str, chave: str, valor: str, gravado_em: float, acessado_em: float) -> None:
+        self._memoria[(fonte, chave)] = (valor, gravado_em, acessado_em)
+        self._memoria.move_to_end((fonte, chave))
+        while len(self._memoria) > self.max_memoria:
+            self._memoria.popitem(last=False)
+
+    def _despejar(self) -> None:
+        total = self._conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+        excesso = total - self.max_entradas
+        if excesso > 0:
+            self._conexao.execute(
+                "DELETE FROM respostas WHERE (fonte, chave) IN "
+                "(SELECT fonte, chave FROM respostas ORDER BY acessado_em LIMIT ?)",
+                (excesso,)
+            )
+            self._memoria.clear()
+
+    def estatisticas(self) -> Dict:
+        """
+        Contadores de acertos e falhas do cache
+        """
+        with self._lock:
+            total = self._conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+        consultas = self.acertos + self.falhas
+        return {
+            "arquivo": self.arquivo,
+            "entradas": total,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": round(self.acertos / consultas, 4) if consultas else 0.0
+        }
+
+    def fechar(self) -> None:
+        with self._lock:
+            self._despejar()
+            self._conexao.close()
+
+
+class _BaldeTokens:
+    """
+    Token bucket de um host; `atualizado` no futuro representa um bloqueio (Retry-After)
+    """
+
+    def __init__(self, requisicoes: Optional[float], periodo: float):
+        self.taxa = requisicoes / periodo if requisicoes else None
+        self.capacidade = max(1.0, float(requisicoes or 1))
+        self.tokens = self.capacidade
+        self.atualizado = time.monotonic()
+
+    def _saldo(self, agora: float) -> float:
+        if self.taxa is None:
+            # Sem cota: apenas bloqueios por Retry-After
+            return 1.0 if agora >= self.atualizado else (agora - self.atualizado)
+        return min(self.capacidade, self.tokens + (agora - self.atualizado) * self.taxa)
+
+    def espera(self, agora: float) -> float:
+        saldo = self._saldo(agora)
+        if saldo >= 1:
+            return 0.0
+        if self.taxa is None:
+            return self.atualizado - agora
+        return (1 - saldo) / self.taxa
+
+    def reservar(self, agora: float) -> float:
+        espera = self.espera(agora)
+        if self.taxa is not None:
+            self.tokens = self._saldo(agora) - 1
+            self.atualizado = agora
+        return espera
+
+    def devolver(self) -> None:
+        if self.taxa is not None:
+            self.tokens = min(self.capacidade, self.tokens + 1)
+
+    def bloquear(self, ate: float) -> None:
+        if ate > self.atualizado:
+            self.tokens = 0.0
+            self.atualizado = ate
+
+
+class _BaldeCompartilhado(_BaldeTokens):
+    """
+    Balde cujo saldo fica em memória compartilhada entre processos (ver LimitadorTaxa.compartilhar)
+    """
+
+    def __init__(self, requisicoes: float, periodo: float, estado, indice: int):
+        # Sem _BaldeTokens.__init__: o saldo já existe e não pode ser reiniciado
+        self.taxa = requisicoes / periodo
+        self.capacidade = max(1.0, float(requisicoes))
+        self._estado = estado
+        self._indice = 2 * indice
+
+    @property
+    def tokens(self) -> float:
+        return self._estado[self._indice]
+
+    @tokens.setter
+    def tokens(self, valor: float) -> None:
+        self._estado[self._indice] = valor
+
+    @property
+    def atualizado(self) -> float:
+        return self._estado[self._indice + 1]
+
+    @atualizado.setter
+    def atualizado(self, valor: float) -> None:
+        self._estado[self._indice + 1] = valor
+
+
+class LimitadorTaxa:
+    """
+    Limitador de taxa por host (token bucket) que respeita Retry-After
+
+    As cotas são (requisições, período em segundos); hosts sem cota
+    configurada não são limitados, mas ainda respeitam bloqueios de 429.
+    Com `compartilhado` (de compartilhar()), os baldes das cotas são os
+    mesmos em todos os processos: N processos dividem uma única cota.
+    """
+
+    COTAS_PADRAO = {
+        'www.receitaws.com.br': (3, 60),
+        'valoresareceber.bcb.gov.br': (2, 1)
+    }
+
+    def __init__(self, cotas: Optional[Dict[str, Tuple[float, float]]] = None, compartilhado=None):
+        self.cotas = dict(self.COTAS_PADRAO)
+        self.cotas.update(cotas or {})
+        self.rejeicoes = 0
+        self._baldes = {}
+        self._lock = threading.Lock()
+        if compartilhado is not None:
+            self._lock, estado = compartilhado
+            for indice, host in enumerate(sorted(self.cotas)):
+                requisicoes, periodo = self.cotas[host]
+                self._baldes[host] = _BaldeCompartilhado(requisicoes, periodo, estado, indice)
+
+    def compartilhar(self) -> Tuple:
+        """
+        Copia os baldes das cotas para memória compartilhada; passe o retorno a processos filhos
+        """
+        import multiprocessing
+        hosts = sorted(self.cotas)
+        estado = multiprocessing.RawArray('d', 2 * len(hosts))
+        with self._lock:
+            for indice, host in enumerate(hosts):
+                balde = self._balde(host)
+                estado[2 * indice], estado[2 * indice + 1] = balde.tokens, balde.atualizado
+        return multiprocessing.Lock(), estado
+
+    def _balde(self, host: str) -> _BaldeTokens:
+        balde = self._baldes.get(host)
+        if balde is None:
+            requisicoes, periodo = self.cotas.get(host, (None, 1))
+            balde = self._baldes[host] = _BaldeTokens(requisicoes, periodo)
+        return balde
+
+    def espera_estimada(self, host: str) -> float:
+        """
+        Segundos até haver token para o host, sem consumi-lo
+        """
+        with self._lock:
+            return self._balde(host).espera(time.monotonic())
+
+    def reservar(self, host: str) -> float:
+        """
+        Consome um token do host e retorna quanto esperar antes de usá-lo
+        """
+        with self._lock:
+            return self._balde(host).reservar(time.monotonic())
+
+    def tentar_reservar(self, host: str) -> float:
+        """
+        Consome um token só se houver um disponível agora; senão retorna a espera sem consumir
+        """
+        with self._lock:
+            balde = self._balde(host)
+            agora = time.monotonic()
+            espera = balde.espera(agora)
+            if espera <= 0:
+                balde.reservar(agora)
+            return espera
+
+    def devolver(self, host: str) -> None:
+        """
+        Devolve um token reservado que não chegou a ser usado
+        """
+        with self._lock:
+            self._balde(host).devolver()
+
+    def bloquear(self, host: str, segundos: float) -> None:
+        """
+        Suspende o host após uma rejeição (HTTP 429)
+        """
+        with self._lock:
+            self.rejeicoes += 1
+            self._balde(host).bloquear(time.monotonic() + segundos)
+
+    def intervalo_padrao(self, host: str) -> float:
+        requisicoes, periodo = self.cotas.get(host, (None, 1))
+        return max(1.0, periodo / requisicoes) if requisicoes else 1.0
+
+
+def _segundos_retry_after(valor: Optional[str]) -> Optional[float]:
+    """
+    Interpreta o cabeçalho Retry-After (segundos ou data HTTP)
+    """
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class PoliticaRetentativa:
+    """
+    Retentativas limitadas com backoff exponencial e jitter (full jitter)
+
+    Só repete métodos idempotentes e falhas transitórias: erro de conexão,
+    tempo esgotado e os status 502/503/504.
+    """
+
+    METODOS_IDEMPOTENTES = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+    STATUS_RETENTAVEIS = frozenset({502, 503, 504})
+
+    def __init__(self, tentativas: int = 3, base: float = 0.5, maximo: float = 8.0):
+        self.tentativas = max(1, tentativas)
+        self.base = base
+        self.maximo = maximo
+
+    def repetivel(self, metodo: str, status: Optional[int] = None, erro: Optional[BaseException] = None) -> bool:
+        if metodo.upper() not in self.METODOS_IDEMPOTENTES:
+            return False
+        if erro is not None:
+            return _falha_transitoria(erro)
+        return status in self.STATUS_RETENTAVEIS
+
+    def espera(self, tentativa: int, retry_after: Optional[float] = None) -> float:
+        """
+        Pausa antes da tentativa seguinte à de número `tentativa` (a partir de 1)
+        """
+        import random
+        espera = random.uniform(0, min(self.maximo, self.base * (2 ** (tentativa - 1))))
+        if retry_after is not None:
+            espera = max(espera, min(self.maximo, retry_after))
+        return espera
+
+
+def _falha_transitoria(erro: BaseException) -> bool:
+    """
+    Indica se a exceção é uma falha de rede que vale repetir
+    """
+    if isinstance(erro, (ConnectionError, TimeoutError, EOFError)):
+        # EOFError cobre asyncio.IncompleteReadError (resposta truncada)
+        return True
+    # Só há exceções do requests se ele já foi importado pela sessão
+    requests = sys.modules.get('requests')
+    return requests is not None and isinstance(erro, (
+        requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+        requests.exceptions.ChunkedEncodingError))
+
+
+class CircuitoAberto(ConnectionError):
+    """
+    Requisição recusada localmente porque o circuito do host está aberto
+    """
+
+
+class _Circuito:
+    def __init__(self):
+        self.estado = 'fechado'
+        self.falhas = 0
+        self.aberto_ate = 0.0
+        self.sonda_em_andamento = False
+
+
+class DisjuntorHosts:
+    """
+    Circuit breaker por host: fechado -> aberto -> meio-aberto -> fechado
+
+    Após `limiar_falhas` falhas seguidas o host fica aberto por `tempo_aberto`
+    segundos e as consultas falham na hora; depois uma única requisição de
+    sonda (meio-aberto) decide se o circuito fecha ou volta a abrir.
+    """
+
+    def __init__(self, limiar_falhas: int = 5, tempo_aberto: float = 30.0):
+        self.limiar_falhas = limiar_falhas
+        self.tempo_aberto = tempo_aberto
+        self._circuitos = {}
+        self._lock = threading.Lock()
+
+    def _circuito(self, host: str) -> _Circuito:
+        circuito = self._circuitos.get(host)
+        if circuito is None:
+            circuito = self._circuitos[host] = _Circuito()
+        return circuito
+
+    def estado(self, host: str) -> str:
+        with self._lock:
+            return self._circuito(host).estado
+
+    def permitir(self, host: str) -> Optional[str]:
+        """
+        Libera uma requisição ao host ou levanta CircuitoAberto; retorna o novo estado se mudou
+        """
+        with self._lock:
+            circuito = self._circuito(host)
+            if circuito.estado == 'fechado':
+                return None
+            agora = time.monotonic()
+            if circuito.estado == 'aberto' and agora >= circuito.aberto_ate:
+                circuito.estado = 'meio_aberto'
+                circuito.sonda_em_andamento = True
+                return 'meio_aberto'
+            if circuito.estado == 'meio_aberto' and not circuito.sonda_em_andamento:
+                circuito.sonda_em_andamento = True
+                return None
+            restante = max(0.0, circuito.aberto_ate - agora)
+            raise CircuitoAberto(f"Circuito aberto para {host}; nova tentativa em {restante:.0f}s")
+
+    def registrar(self, host: str, sucesso: bool) -> Optional[str]:
+        """
+        Registra o desfecho de uma requisição; retorna o novo estado se mudou
+        """
+        with self._lock:
+            circuito = self._circuito(host)
+            anterior = circuito.estado
+            circuito.sonda_em_andamento = False
+            if sucesso:
+                circuito.falhas = 0
+                circuito.estado = 'fechado'
+            else:
+                circuito.falhas += 1
+                if anterior == 'meio_aberto' or circuito.falhas >= self.limiar_falhas:
+                    circuito.estado = 'aberto'
+                    circuito.aberto_ate = time.monotonic() + self.tempo_aberto
+            return circuito.estado if circuito.estado != anterior else None
+
+    def liberar(self, host: str) -> None:
+        """
+        Libera a sonda de uma requisição que terminou sem desfecho (ex.: 429)
+        """
+        with self._lock:
+            self._circuito(host).sonda_em_andamento = False
+
+
+class EscalonadorHosts:
+    """
+    Despacha tarefas de rede intercalando hosts conforme a cota disponível
+
+    Cada host tem sua fila; o despachante sempre libera a tarefa do host
+    cujo token fica disponível primeiro (rodízio em caso de empate), de
+    modo que nenhuma thread dorme esperando um host lento enquanto outro
+    host tem cota sobrando.
+    """
+
+    def __init__(self, limitador: LimitadorTaxa, trabalhadores: int = 8):
+        self.limitador = limitador
+        self._pendentes = OrderedDict()
+        self._condicao = threading.Condition()
+        self._ativo = True
+        from concurrent.futures import ThreadPoolExecutor
+        self._executor = ThreadPoolExecutor(max_workers=max(1, trabalhadores),
+                                            thread_name_prefix='mrholmescorp-host')
+        self._despachante = threading.Thread(target=self._despachar, name='mrholmescorp-escalonador',
+                                             daemon=True)
+        self._despachante.start()
+
+    def submeter(self, host: str, funcao: Callable[[], Dict]) -> 'Future':
+        """
+        Agenda a função para quando o host tiver cota; o token já vem reservado
+        """
+        from concurrent.futures import Future
+        futuro = Future()
+        with self._condicao:
+            if not self._ativo:
+                raise RuntimeError("Escalonador encerrado")
+            self._pendentes.setdefault(host, deque()).append((funcao, futuro))
+            self._condicao.notify()
+        return futuro
+
+    def _despachar(self) -> None:
+        while True:
+            with self._condicao:
+                while True:
+                    if not self._pendentes:
+                        if not self._ativo:
+                            return
+                        self._condicao.wait()
+                        continue
+                    host, espera = min(((h, self.limitador.espera_estimada(h)) for h in self._pendentes),
+                                       key=lambda item: item[1])
+                    if espera <= 0:
+                        # Outro processo pode ter levado o token desde a estimativa
+                        espera = self.limitador.tentar_reservar(host)
+                        if espera <= 0:
+                            break
+                    self._condicao.wait(timeout=espera)
+
+                fila = self._pendentes[host]
+                funcao, futuro = fila.popleft()
+                if fila:
+                    self._pendentes.move_to_end(host)
+                else:
+                    del self._pendentes[host]
+
+            if not futuro.set_running_or_notify_cancel():
+                self.limitador.devolver(host)
+                continue
+            self._executor.submit(self._executar, funcao, futuro)
+
+    def devolver(self, host: str) -> None:
+        """
+        Devolve o token de uma tarefa que não chegou a fazer requisição (cache ou voo coalescido)
+        """
+        self.limitador.devolver(host)
+        with self._condicao:
+            self._condicao.notify()
+
+    @staticmethod
+    def _executar(funcao: Callable[[], Dict], futuro: 'Future') -> None:
+        try:
+            futuro.set_result(funcao())
+        except BaseException as e:
+            futuro.set_exception(e)
+
+    def encerrar(self) -> None:
+        with self._condicao:
+            self._ativo = False
+            self._condicao.notify()
+        self._despachante.join()
+        self._executor.shutdown(wait=True)
+
+
+class VooUnico:
+    """
+    Coalescência de chamadas idênticas em andamento (single flight)
+
+    A primeira chamada de uma chave executa; as concorrentes da mesma chave
+    esperam por ela e recebem o mesmo resultado (ou a mesma exceção). Vale
+    para threads e corrotinas, inclusive misturadas: o voo é um
+    concurrent.futures.Future que corrotinas aguardam via asyncio.wrap_future.
+    """
+
+    def __init__(self):
+        self.economizadas = 0
+        self._voos = {}
+        self._lock = threading.Lock()
+
+    def _embarcar(self, chave: Tuple) -> Tuple['Future', bool]:
+        from concurrent.futures import Future
+        with self._lock:
+            voo = self._voos.get(chave)
+            if voo is not None:
+                self.economizadas += 1
+                return voo, False
+            voo = self._voos[chave] = Future()
+            return voo, True
+
+    def _pousar(self, chave: Tuple, voo: 'Future', resultado=None, erro: Optional[BaseException] = None) -> None:
+        with self._lock:
+            del self._voos[chave]
+        if erro is not None:
+            voo.set_exception(erro)
+        else:
+            voo.set_result(resultado)
+
+    def executar(self, chave: Tuple, funcao: Callable[[], Dict]) -> Tuple[Dict, bool]:
+        """
+        Executa ou aguarda o voo da chave; retorna (resultado, se esta chamada executou)
+        """
+        voo, lider = self._embarcar(chave)
+        if not lider:
+            return voo.result(), False
+        try:
+            resultado = funcao()
+        except BaseException as e:
+            self._pousar(chave, voo, erro=e)
+            raise
+        self._pousar(chave, voo, resultado)
+        return resultado, True
+
+    async def executar_async(self, chave: Tuple, fabrica) -> Tuple[Dict, bool]:
+        """
+        Equivalente de executar para corrotinas; `fabrica` cria a corrotina só se esta chamada executar
+        """
+        import asyncio
+        voo, lider = self._embarcar(chave)
+        if not lider:
+            return await asyncio.wrap_future(voo), False
+        try:
+            resultado = await fabrica()
+        except BaseException as e:
+            self._pousar(chave, voo, erro=e)
+            raise
+        self._pousar(chave, voo, resultado)
+        return resultado, True
+
+
+class RegistroMetricas:
+    """
+    Registro de métricas em processo: contadores e histogramas com rótulos
+
+    Exporta no formato texto do Prometheus (exportar_prometheus) ou como
+    dicionário (instantaneo).
+    """
+
+    LIMITES_DURACAO = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    DESCRICOES = {
+        'mrholmescorp_consultas_total': 'Consultas executadas por fonte e classe de resultado',
+        'mrholmescorp_consulta_duracao_segundos': 'Tempo de parede das consultas por fonte',
+        'mrholmescorp_bytes_recebidos_total': 'Bytes de corpo HTTP recebidos por fonte',
+        'mrholmescorp_http_respostas_total': 'Respostas HTTP por fonte e status',
+        'mrholmescorp_retentativas_total': 'Requisições repetidas por fonte',
+        'mrholmescorp_cache_total': 'Acertos e falhas de cache por fonte',
+        'mrholmescorp_fontes_expiradas_total': 'Fontes abandonadas por prazo esgotado',
+        'mrholmescorp_circuito_transicoes_total': 'Mudanças de estado do circuit breaker por host',
+        'mrholmescorp_api_respostas_total': 'Respostas da API local (--serve) por status',
+        'mrholmescorp_chamadas_economizadas_total': 'Consultas atendidas por uma chamada idêntica já em andamento'
+    }
+
+    def __init__(self):
+        self._contadores = {}
+        self._histogramas = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chave(nome: str, rotulos: Dict[str, str]) -> Tuple:
+        return (nome, tuple(sorted((k, str(v)) for k, v in rotulos.items())))
+
+    def incrementar(self, nome: str, valor: float = 1, **rotulos) -> None:
+        chave = self._chave(nome, rotulos)
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + valor
+
+    def observar(self, nome: str, valor: float, **rotulos) -> None:
+        chave = self._chave(nome, rotulos)
+        with self._lock:
+            histograma = self._histogramas.get(chave)
+            if histograma is None:
+                histograma = self._histogramas[chave] = [[0] * len(self.LIMITES_DURACAO), 0, 0.0]
+            for i, limite in enumerate(self.LIMITES_DURACAO):
+                if valor <= limite:
+                    histograma[0][i] += 1
+            histograma[1] += 1
+            histograma[2] += valor
+
+    @staticmethod
+    def _rotulos(rotulos: Tuple, extra: str = '') -> str:
+        partes = [f'{k}="{v}"' for k, v in rotulos]
+        if extra:
+            partes.append(extra)
+        return '{' + ','.join(partes) + '}' if partes else ''
+
+    def exportar_prometheus(self) -> str:
+        """
+        Métricas no formato de exposição texto do Prometheus
+        """
+        with self._lock:
+            contadores = sorted(self._contadores.items())
+            histogramas = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._histogramas.items())
+
+        linhas, vistos = [], set()
+        for (nome, rotulos), valor in contadores:
+            if nome not in vistos:
+                vistos.add(nome)
+                linhas.append(f"# HELP {nome} {self.DESCRICOES.get(nome, nome)}")
+                linhas.append(f"# TYPE {nome} counter")
+            linhas.append(f"{nome}{self._rotulos(rotulos)} {valor}")
+        for (nome, rotulos), (baldes, total, soma) in histogramas:
+            if nome not in vistos:
+                vistos.add(nome)
+                linhas.append(f"# HELP {nome} {self.DESCRICOES.get(nome, nome)}")
+                linhas.append(f"# TYPE {nome} histogram")
+            for limite, quantidade in zip(self.LIMITES_DURACAO, baldes):
+                rotulo_le = 'le="%s"' % limite
+                linhas.append(f"{nome}_bucket{self._rotulos(rotulos, rotulo_le)} {quantidade}")
+            rotulo_le = 'le="+Inf"'
+            linhas.append(f"{nome}_bucket{self._rotulos(rotulos, rotulo_le)} {total}")
+            linhas.append(f"{nome}_sum{self._rotulos(rotulos)} {soma}")
+            linhas.append(f"{nome}_count{self._rotulos(rotulos)} {total}")
+        return "\n".join(linhas) + "\n"
+
+    def instantaneo(self) -> Dict:
+        """
+        Cópia das métricas como dicionário serializável em JSON
+        """
+        with self._lock:
+            return {
+                "contadores": [{"nome": n, "rotulos": dict(r), "valor": v}
+                               for (n, r), v in sorted(self._contadores.items())],
+                "histogramas": [{"nome": n, "rotulos": dict(r), "limites": list(self.LIMITES_DURACAO),
+                                 "baldes": list(h[0]), "total": h[1], "soma": h[2]}
+                                for (n, r), h in sorted(self._histogramas.items())]
+            }
+
+    def gravar(self, arquivo: str) -> None:
+        """
+        Grava as métricas (JSON se o arquivo terminar em .json, senão texto Prometheus)
+        """
+        with open(arquivo, 'w', encoding='utf-8') as f:
+            if arquivo.endswith('.json'):
+                json.dump(self.instantaneo(), f, ensure_ascii=False, indent=2)
+            else:
+                f.write(self.exportar_prometheus())
+
+
+def servir_metricas(registro: RegistroMetricas, porta: int, host: str = '127.0.0.1'):
+    """
+    Expõe GET /metrics no formato Prometheus em uma thread de fundo
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Manipulador(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            corpo = registro.exportar_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(corpo)))
+            self.end_headers()
+            self.wfile.write(corpo)
+
+    servidor = ThreadingHTTPServer((host, porta), Manipulador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name='mrholmescorp-metricas', daemon=True).start()
+    return servidor
+
+
+class PerfiladorThreads:
+    """
+    Agrega perfis cProfile de várias threads em um único relatório
+
+    ativo() é reentrante por thread: chamadas aninhadas usam o perfil já ligado.
+    """
+
+    def __init__(self):
+        self._estatisticas = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def ativo(self):
+        perfilador = self
+
+        class _Contexto:
+            def __enter__(self):
+                self.perfil = None
+                if getattr(perfilador._local, 'ligado', False):
+                    return self
+                perfilador._local.ligado = True
+                import cProfile
+                self.perfil = cProfile.Profile()
+                self.perfil.enable()
+                return self
+
+            def __exit__(self, *args):
+                if self.perfil is None:
+                    return False
+                self.perfil.disable()
+                perfilador._local.ligado = False
+                with perfilador._lock:
+                    if perfilador._estatisticas is None:
+                        import pstats
+                        perfilador._estatisticas = pstats.Stats(self.perfil)
+                    else:
+                        perfilador._estatisticas.add(self.perfil)
+                return False
+
+        return _Contexto()
+
+    def relatorio(self, limite: int = 40) -> str:
+        """
+        Funções com maior tempo acumulado, em texto
+        """
+        with self._lock:
+            if self._estatisticas is None:
+                return ""
+            saida = io.StringIO()
+            self._estatisticas.stream = saida
+            self._estatisticas.sort_stats('cumulative').print_stats(limite)
+            return saida.getvalue()
+
+
+# Dados da chamada de fonte em andamento, preenchidos pela camada HTTP e pelo cache
+_CHAMADA_ATUAL = contextvars.ContextVar('mrholmescorp_chamada_atual', default=None)
+
+
+def _classificar_resultado(resultado: Dict, chamada: Dict) -> str:
+    """
+    Classe de resultado de uma consulta para as métricas
+    """
+    if "erro" not in resultado:
+        return "sucesso"
+    if chamada.get('compartilhada'):
+        return "compartilhada"
+    if chamada['requisicoes'] == 0:
+        return "rejeitada"
+    status = chamada['status']
+    if status is None:
+        return "falha_rede"
+    if status == 429:
+        return "limitada"
+    if status >= 500:
+        return "erro_servidor"
+    if status >= 400:
+        return "erro_cliente"
+    return "resposta_invalida"
+
+
+class _Compacto(Mapping):
+    """
+    Base dos resultados compactos: objetos com __slots__ lidos como dict
+
+    resultado["campo"], .get(), "erro" in resultado e a comparação com dicts
+    funcionam como antes; o dict equivalente só é montado na serialização
+    (hook default= do json, ver _serializar_json). Campos em _OPCIONAIS com
+    valor None ficam fora do resultado; os de _INTERNAR são internados, de
+    modo que valores repetidos entre registros (UF, município, CNAE...)
+    ocupam memória uma única vez.
+    """
+
+    __slots__ = ()
+    _CAMPOS: Tuple[str, ...] = ()
+    _OPCIONAIS = frozenset()
+    _INTERNAR = frozenset()
+
+    def __init__(self, *valores, **nomeados):
+        for campo, valor in zip(self._CAMPOS, valores):
+            nomeados[campo] = valor
+        for campo in self._CAMPOS:
+            valor = nomeados.pop(campo, None)
+            if campo in self._INTERNAR and type(valor) is str:
+                valor = sys.intern(valor)
+            setattr(self, campo, valor)
+        if nomeados:
+            raise TypeError(f"Campos desconhecidos para {type(self).__name__}: {', '.join(nomeados)}")
+
+    def _itens(self) -> Iterator[Tuple[str, object]]:
+        for campo in self._CAMPOS:
+            valor = getattr(self, campo)
+            if valor is None and campo in self._OPCIONAIS:
+                continue
+            yield campo, valor
+
+    def __getitem__(self, chave: str):
+        if chave in self._CAMPOS:
+            valor = getattr(self, chave)
+            if valor is not None or chave not in self._OPCIONAIS:
+                return valor
+        raise KeyError(chave)
+
+    def __iter__(self) -> Iterator[str]:
+        return (campo for campo, _ in self._itens())
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self._itens())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.para_dict()!r})"
+
+    def para_dict(self) -> Dict:
+        """
+        Dict equivalente de um nível (valores compactos aninhados são mantidos)
+        """
+        return dict(self._itens())
+
+
+class Atividade(_Compacto):
+    __slots__ = _CAMPOS = ('code', 'text')
+    _INTERNAR = frozenset(_CAMPOS)
+
+    @classmethod
+    def de(cls, item):
+        """
+        Converte {"code", "text"} da API; outros formatos são mantidos como vieram
+        """
+        if isinstance(item, dict) and item.keys() == {'code', 'text'}:
+            return cls(item['code'], item['text'])
+        return item
+
+
+class Endereco(_Compacto):
+    __slots__ = _CAMPOS = ('logradouro', 'numero', 'bairro', 'municipio', 'uf', 'cep')
+    _INTERNAR = frozenset(('bairro', 'municipio', 'uf'))
+
+
+class RegistroEmpresa(_Compacto):
+    """
+    Empresa no formato da ReceitaWS (fonte online ou base offline)
+    """
+
+    __slots__ = _CAMPOS = ('fonte', 'cnpj', 'razao_social', 'nome_fantasia', 'situacao', 'capital_social',
+                           'endereco', 'atividade_principal', 'atividades_secundarias', 'socios', 'url_fonte')
+    _INTERNAR = frozenset(('fonte', 'situacao', 'url_fonte'))
+
+    @classmethod
+    def de_dict(cls, dados: Dict) -> Dict:
+        """
+        Reconstrói o registro a partir do JSON (ex.: do cache); formatos diferentes voltam como vieram
+        """
+        if not isinstance(dados, dict) or dados.keys() != set(cls._CAMPOS) or not isinstance(dados['endereco'], dict):
+            return dados
+        campos = dict(dados)
+        campos['endereco'] = Endereco(**dados['endereco']) if dados['endereco'].keys() == set(Endereco._CAMPOS) \
+            else dados['endereco']
+        campos['atividade_principal'] = [Atividade.de(a) for a in dados['atividade_principal'] or []]
+        campos['atividades_secundarias'] = [Atividade.de(a) for a in dados['atividades_secundarias'] or []]
+        return cls(**campos)
+
+
+class StatusFonte(_Compacto):
+    """
+    Resultado de uma fonte que não trouxe dados: erro, prazo esgotado etc.
+    """
+
+    __slots__ = _CAMPOS = ('erro', 'status', 'tempo_limite', 'url_fonte', 'url_portal')
+    _OPCIONAIS = frozenset(('status', 'tempo_limite', 'url_fonte', 'url_portal'))
+    _INTERNAR = frozenset(('status', 'url_portal'))
+
+
+_VARIAVEL = object()
+
+
+class _ModeloReferencia:
+    """
+    Parte fixa de uma ReferenciaEstatica: chaves em ordem e valores constantes
+    """
+
+    __slots__ = ('campos', 'constantes', 'posicoes')
+
+    def __init__(self, campos: Iterable[Tuple[str, object]]):
+        campos = tuple(campos)
+        self.campos = tuple(chave for chave, _ in campos)
+        self.constantes = {chave: valor for chave, valor in campos if valor is not _VARIAVEL}
+        variaveis = [chave for chave, valor in campos if valor is _VARIAVEL]
+        self.posicoes = {chave: posicao for posicao, chave in enumerate(variaveis)}
+
+
+class ReferenciaEstatica(_Compacto):
+    """
+    Resultado de fonte estática: o modelo (fonte, status, URLs, observação)
+    é compartilhado por todas as consultas e só os valores da consulta
+    (documento, nome, placa...) são guardados por resultado.
+    """
+
+    __slots__ = ('modelo', 'valores')
+
+    def __init__(self, modelo: _ModeloReferencia, valores: Tuple):
+        self.modelo = modelo
+        self.valores = valores
+
+    def _itens(self) -> Iterator[Tuple[str, object]]:
+        modelo = self.modelo
+        for chave in modelo.campos:
+            posicao = modelo.posicoes.get(chave)
+            yield chave, modelo.constantes[chave] if posicao is None else self.valores[posicao]
+
+    def __getitem__(self, chave: str):
+        posicao = self.modelo.posicoes.get(chave)
+        if posicao is not None:
+            return self.valores[posicao]
+        return self.modelo.constantes[chave]
+
+    def __len__(self) -> int:
+        return len(self.modelo.campos)
+
+
+def _serializar_json(objeto):
+    """
+    Hook default= do json: resultados compactos viram o dict equivalente
+    """
+    if isinstance(objeto, _Compacto):
+        return objeto.para_dict()
+    raise TypeError(f"Objeto do tipo {type(objeto).__name__} não é serializável em JSON")
+
+
+SITUACOES_CADASTRAIS = {
+    '01': 'NULA',
+    '02': 'ATIVA',
+    '03': 'SUSPENSA',
+    '04': 'INAPTA',
+    '08': 'BAIXADA'
+}
+
+# Entrada do índice: chave (CNPJ ou CNPJ básico), deslocamento e tamanho do registro
+_ENTRADA_INDICE = struct.Struct('<QQI')
+_SEPARADOR_CAMPOS = '\x1f'
+
+
+class _GravadorIndexado:
+    """
+    Grava registros de tamanho variável e um índice ordenado de entradas fixas
+
+    O índice é ordenado por merge sort externo: lotes de `tamanho_lote`
+    entradas são ordenados em memória e gravados em arquivos temporários,
+    depois intercalados com heapq.merge.
+    """
+
+    def __init__(self, diretorio: str, nome: str, tamanho_lote: int):
+        self.caminho_dados = os.path.join(diretorio, f"{nome}.dat")
+        self.caminho_indice = os.path.join(diretorio, f"{nome}.idx")
+        self.tamanho_lote = tamanho_lote
+        self.total = 0
+        self._dados = open(self.caminho_dados, 'wb')
+        self._deslocamento = 0
+        self._lote = []
+        self._trechos = []
+        import tempfile
+        self._temporario = tempfile.mkdtemp(prefix=f"mrholmescorp_{nome}_", dir=diretorio)
+
+    def adicionar(self, chave: int, campos: List[str]) -> None:
+        registro = _SEPARADOR_CAMPOS.join(campos).encode('utf-8')
+        self._dados.write(registro)
+        self._lote.append((chave, self._deslocamento, len(registro)))
+        self._deslocamento += len(registro)
+        self.total += 1
+        if len(self._lote) >= self.tamanho_lote:
+            self._gravar_trecho()
+
+    def _gravar_trecho(self) -> None:
+        self._lote.sort()
+        caminho = os.path.join(self._temporario, f"trecho_{len(self._trechos):05d}")
+        with open(caminho, 'wb') as f:
+            for entrada in self._lote:
+                f.write(_ENTRADA_INDICE.pack(*entrada))
+        self._trechos.append(caminho)
+        self._lote = []
+
+    @staticmethod
+    def _ler_trecho(caminho: str) -> Iterator[Tuple[int, int, int]]:
+        tamanho_bloco = _ENTRADA_INDICE.size * 4096
+        with open(caminho, 'rb') as f:
+            while True:
+                bloco = f.read(tamanho_bloco)
+                if not bloco:
+                    return
+                yield from _ENTRADA_INDICE.iter_unpack(bloco)
+
+    def finalizar(self) -> None:
+        self._dados.close()
+        if self._lote or not self._trechos:
+            self._gravar_trecho()
+        with open(self.caminho_indice, 'wb') as f:
+            for entrada in heapq.merge(*(self._ler_trecho(c) for c in self._trechos)):
+                f.write(_ENTRADA_INDICE.pack(*entrada))
+        for caminho in self._trechos:
+            os.remove(caminho)
+        os.rmdir(self._temporario)
+
+
+class _TabelaIndexada:
+    """
+    Par dados/índice mapeado em memória, com busca binária pela chave
+    """
+
+    def __init__(self, diretorio: str, nome: str):
+        self._arquivos = []
+        self._dados = self._mapear(os.path.join(diretorio, f"{nome}.dat"))
+        self._indice = self._mapear(os.path.join(diretorio, f"{nome}.idx"))
+        self.total = len(self._indice) // _ENTRADA_INDICE.size if self._indice else 0
+
+    def _mapear(self, caminho: str):
+        f = open(caminho, 'rb')
+        self._arquivos.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _chave(self, posicao: int) -> int:
+        return _ENTRADA_INDICE.unpack_from(self._indice, posicao * _ENTRADA_INDICE.size)[0]
+
+    def buscar(self, chave: int) -> List[List[str]]:
+        """
+        Todos os registros com a chave, na ordem de importação
+        """
+        inicio, fim = 0, self.total
+        while inicio < fim:
+            meio = (inicio + fim) // 2
+            if self._chave(meio) < chave:
+                inicio = meio + 1
+            else:
+                fim = meio
+
+        registros = []
+        while inicio < self.total:
+            atual, deslocamento, tamanho = _ENTRADA_INDICE.unpack_from(self._indice, inicio * _ENTRADA_INDICE.size)
+            if atual != chave:
+                break
+            registro = self._dados[deslocamento:deslocamento + tamanho].decode('utf-8')
+            registros.append(registro.split(_SEPARADOR_CAMPOS))
+            inicio += 1
+        return registros
+
+    def fechar(self) -> None:
+        for mapa in (self._dados, self._indice):
+            if isinstance(mapa, mmap.mmap):
+                mapa.close()
+        for f in self._arquivos:
+            f.close()
+
+
+def _arquivos_dump_cnpj(diretorio: str) -> Dict[str, List[str]]:
+    """
+    Classifica os arquivos do dump da Receita (CSV extraídos ou .zip) por tabela
+    """
+    padroes = {
+        'empresas': ('EMPRECSV', 'EMPRESAS'),
+        'estabelecimentos': ('ESTABELE', 'ESTABELECIMENTOS'),
+        'socios': ('SOCIOCSV', 'SOCIOS'),
+        'cnaes': ('CNAECSV', 'CNAES'),
+        'municipios': ('MUNICCSV', 'MUNICIPIOS'),
+        'qualificacoes': ('QUALSCSV', 'QUALIFICACOES')
+    }
+    arquivos = {tabela: [] for tabela in padroes}
+    for nome in sorted(os.listdir(diretorio)):
+        maiusculo = nome.upper()
+        for tabela, marcadores in padroes.items():
+            if any(marcador in maiusculo for marcador in marcadores):
+                arquivos[tabela].append(os.path.join(diretorio, nome))
+                break
+    return arquivos
+
+
+def _linhas_dump_cnpj(caminho: str) -> Iterator[List[str]]:
+    """
+    Linhas de um arquivo do dump (latin-1, separador ';'), lido em streaming
+    """
+    import zipfile
+    if zipfile.is_zipfile(caminho):
+        with zipfile.ZipFile(caminho) as arquivo_zip:
+            for membro in arquivo_zip.namelist():
+                with arquivo_zip.open(membro) as bruto:
+                    texto = io.TextIOWrapper(bruto, encoding='latin-1', newline='')
+                    yield from csv.reader(texto, delimiter=';', quotechar='"')
+    else:
+        with open(caminho, encoding='latin-1', newline='') as texto:
+            yield from csv.reader(texto, delimiter=';', quotechar='"')
+
+
+def importar_base_cnpj(diretorio_csv: str, diretorio_base: str, tamanho_lote: int = 250000,
+                       progresso: Optional[Callable[[str, int], None]] = None) -> Dict[str, int]:
+    """
+    Converte o dump de CNPJ da Receita Federal na base offline indexada
+
+    Lê Empresas, Estabelecimentos e Sócios em uma única passada por arquivo,
+    com memória limitada a `tamanho_lote` entradas de índice por tabela.
+    """
+    arquivos = _arquivos_dump_cnpj(diretorio_csv)
+    if not arquivos['estabelecimentos']:
+        raise ValueError(f"Nenhum arquivo de estabelecimentos encontrado em {diretorio_csv}")
+    os.makedirs(diretorio_base, exist_ok=True)
+
+    tabelas = {}
+    for tabela in ('cnaes', 'municipios', 'qualificacoes'):
+        tabelas[tabela] = {}
+        for caminho in arquivos[tabela]:
+            for linha in _linhas_dump_cnpj(caminho):
+                if len(linha) >= 2:
+                    tabelas[tabela][linha[0]] = linha[1]
+
+    totais = {}
+    extratores = {
+        # cnpj_basico -> razão social, natureza jurídica, capital social, porte
+        'empresas': lambda l: (int(l[0]), [l[1], l[2], l[4], l[5]]),
+        # cnpj completo -> fantasia, situação, endereço, município, CNAEs
+        'estabelecimentos': lambda l: (int(l[0] + l[1] + l[2]),
+                                       [l[4], l[5], l[13], l[14], l[15], l[17], l[18], l[19], l[20],
+                                        l[11], l[12]]),
+        # cnpj_basico -> identificador, nome, documento, qualificação, entrada, representante
+        'socios': lambda l: (int(l[0]), [l[1], l[2], l[3], l[4], l[5], l[8], l[9]])
+    }
+    minimo_colunas = {'empresas': 6, 'estabelecimentos': 21, 'socios': 10}
+
+    for tabela, extrair in extratores.items():
+        gravador = _GravadorIndexado(diretorio_base, tabela, tamanho_lote)
+        try:
+            for caminho in arquivos[tabela]:
+                for linha in _linhas_dump_cnpj(caminho):
+                    if len(linha) < minimo_colunas[tabela] or not linha[0].isdigit():
+                        continue
+                    gravador.adicionar(*extrair(linha))
+                    if progresso is not None and gravador.total % 1000000 == 0:
+                        progresso(tabela, gravador.total)
+        finally:
+            gravador.finalizar()
+        totais[tabela] = gravador.total
+
+    with open(os.path.join(diretorio_base, 'tabelas.json'), 'w', encoding='utf-8') as f:
+        json.dump({"importado_em": datetime.now().isoformat(), "totais": totais, **tabelas},
+                  f, ensure_ascii=False)
+
+    return totais
+
+
+class BaseCNPJOffline:
+    """
+    Consulta local à base de CNPJ gerada por importar_base_cnpj
+
+    Os índices são mapeados em memória e pesquisados por busca binária;
+    o resultado segue o formato de MrHolmesCorp.consultar_cnpj_receitaws.
+    """
+
+    def __init__(self, diretorio: str):
+        self.diretorio = diretorio
+        with open(os.path.join(diretorio, 'tabelas.json'), encoding='utf-8') as f:
+            tabelas = json.load(f)
+        self._cnaes = tabelas.get('cnaes', {})
+        self._municipios = tabelas.get('municipios', {})
+        self._qualificacoes = tabelas.get('qualificacoes', {})
+        # Uma Atividade por CNAE, compartilhada por todos os registros
+        self._atividades = {}
+        self._empresas = _TabelaIndexada(diretorio, 'empresas')
+        self._estabelecimentos = _TabelaIndexada(diretorio, 'estabelecimentos')
+        self._socios = _TabelaIndexada(diretorio, 'socios')
+
+    @staticmethod
+    def _formatar_cnpj(cnpj: str) -> str:
+        return f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+
+    def _atividade(self, codigo: str) -> Atividade:
+        codigo = codigo.strip()
+        atividade = self._atividades.get(codigo)
+        if atividade is None:
+            formatado = f"{codigo[:2]}.{codigo[2:4]}-{codigo[4:5]}-{codigo[5:]}" if len(codigo) == 7 else codigo
+            atividade = self._atividades[codigo] = Atividade(formatado, self._cnaes.get(codigo, ''))
+        return atividade
+
+    def _qualificacao(self, codigo: str) -> Optional[str]:
+        if not codigo or not codigo.strip('0'):
+            return None
+        descricao = self._qualificacoes.get(codigo)
+        return f"{int(codigo)}-{descricao}" if descricao else codigo
+
+    def consultar(self, cnpj: str) -> Optional[RegistroEmpresa]:
+        """
+        Retorna a empresa no formato da ReceitaWS ou None se ausente
+        """
+        estabelecimentos = self._estabelecimentos.buscar(int(cnpj))
+        if not estabelecimentos:
+            return None
+        (fantasia, situacao, tipo_logradouro, logradouro, numero, bairro, cep, uf, municipio,
+         cnae_principal, cnaes_secundarios) = estabelecimentos[0]
+
+        basico = int(cnpj[:8])
+        empresas = self._empresas.buscar(basico)
+        razao_social, _, capital_social, _ = empresas[0] if empresas else ('', '', '', '')
+
+        socios = []
+        for identificador, nome, documento, qualificacao, _, nome_rep, qual_rep in self._socios.buscar(basico):
+            socio = {"nome": nome, "qual": self._qualificacao(qualificacao),
+                     "identificador_socio": identificador, "cnpj_cpf_socio": documento}
+            if nome_rep.strip():
+                socio["nome_rep_legal"] = nome_rep
+                socio["qual_rep_legal"] = self._qualificacao(qual_rep)
+            socios.append(socio)
+
+        return RegistroEmpresa(
+            fonte="Receita Federal - Dados Abertos CNPJ (offline)",
+            cnpj=self._formatar_cnpj(cnpj),
+            razao_social=razao_social,
+            nome_fantasia=fantasia,
+            situacao=SITUACOES_CADASTRAIS.get(situacao, situacao),
+            capital_social=capital_social.replace(',', '.'),
+            endereco=Endereco(
+                logradouro=f"{tipo_logradouro} {logradouro}".strip(),
+                numero=numero,
+                bairro=bairro,
+                municipio=self._municipios.get(municipio, municipio),
+                uf=uf,
+                cep=f"{cep[:2]}.{cep[2:5]}-{cep[5:]}" if len(cep) == 8 else cep
+            ),
+            atividade_principal=[self._atividade(cnae_principal)] if cnae_principal else [],
+            atividades_secundarias=[self._atividade(c) for c in cnaes_secundarios.split(',') if c.strip()],
+            socios=socios,
+            url_fonte=f"file://{os.path.abspath(self.diretorio)}"
+        )
+
+    def fechar(self) -> None:
+        for tabela in (self._empresas, self._estabelecimentos, self._socios):
+            tabela.fechar()
+
+
+class MrHolmesCorp:
+    def __init__(self, timeout: float = 30, cache: Optional[CacheRespostas] = None,
+                 atualizar_cache: bool = False, silencioso: bool = False,
+                 limitador: Optional[LimitadorTaxa] = None, max_rejeicoes: int = 3,
+                 base_offline: Optional[BaseCNPJOffline] = None,
+                 metricas: Optional[RegistroMetricas] = None,
+                 timeout_conexao: Optional[float] = None,
+                 politica: Optional[PoliticaRetentativa] = None,
+                 disjuntor: Optional[DisjuntorHosts] = None,
+                 voo_unico: Optional[VooUnico] = None):
+        # `timeout` limita a leitura da resposta; `timeout_conexao` o estabelecimento da conexão
+        self.timeout = timeout
+        self.timeout_conexao = min(10.0, timeout) if timeout_conexao is None else timeout_conexao
+        self.politica = politica if politica is not None else PoliticaRetentativa()
+        self.disjuntor = disjuntor if disjuntor is not None else DisjuntorHosts()
+        # Consultas simultâneas ao mesmo (fonte, documento) compartilham uma chamada
+        self.voo_unico = voo_unico if voo_unico is not None else VooUnico()
+        self.base_offline = base_offline
+        self.metricas = metricas if metricas is not None else RegistroMetricas()
+        # Com perfilador, cada consulta de fonte é perfilada (--profile)
+        self.perfilador = None
+        self.silencioso = silencioso
+        self.limitador = limitador
+        self.max_rejeicoes = max_rejeicoes
+        # Com escalonador, as fontes de rede são despachadas por host (modo lote)
+        self.escalonador = None
+        # Com atualizar_cache=True o cache é ignorado na leitura mas renovado na gravação
+        self.cache = cache
+        self.atualizar_cache = atualizar_cache
+        # Prazo absoluto (time.monotonic) da consulta em andamento na thread atual
+        self._local = threading.local()
+
+        # Catálogos estáticos montados uma única vez (ver catalogos_estaticos)
+        self._catalogos = None
+        # Modelos compartilhados dos resultados de fontes estáticas (ver _referencia)
+        self._modelos = {}
+
+        # Pilha HTTP criada só quando alguma fonte de rede é consultada
+        self._session = None
+        self._lock_session = threading.Lock()
+        self._motor = None
+
+        # URLs das fontes de dados
+        self.urls = {
+            'caixa_programas': 'https://www.caixa.gov.br/programas-sociais/Paginas/default.aspx',
+            'caixa_beneficios': 'https://www.beneficiossociais.caixa.gov.br/consulta/beneficio/04.01.00-00_00.asp',
+            'auxilio_emergencial': 'https://consultaauxilio.cidadania.gov.br/consulta/#/',
+            'receita_cnpj': 'http://www.receita.fazenda.gov.br/PessoaJuridica/CNPJ/cnpjreva/Cnpjreva_Solicitacao.asp',
+            'bcb_valores': 'https://valoresareceber.bcb.gov.br/publico/',
+            'bcb_api': 'https://valoresareceber.bcb.gov.br/publico/rest/valoresAReceber/',
+            'receitaws_api': 'https://www.receitaws.com.br/v1/cnpj/',
+            'omnisci_demo': 'https://www.omnisci.com/demos/tweetmap',
+            'scan_user_repo': 'https://github.com/faciltech/scan-user',
+            'osint_brasil_repo': 'https://github.com/felipeluan20/OSINTKit-Brasil',
+            'dados_gov': 'https://dados.gov.br/home',
+            'brasil_io': 'https://brasil.io/datasets/',
+            'ibict_dados': 'https://dados.ibict.br/dataset',
+            'bcb_dados': 'https://dadosabertos.bcb.gov.br/dataset',
+            'turismo_dados': 'https://dados.turismo.gov.br/dataset/',
+            'mj_dados': 'https://dados.mj.gov.br/dataset',
+            'sc_dados': 'https://dados.sc.gov.br/',
+            'sp_policia_rg': 'https://www.policiacivil.sp.gov.br/portal/faces/pages_home/servicos/consultaSituacaoRG',
+            'sp_transparencia': 'https://www.transparencia.sp.gov.br/home/servidor',
+            'receita_cnpj_oficial': 'https://solucoes.receita.fazenda.gov.br/servicos/cnpjreva/cnpjreva_solicitacao.asp',
+            'receita_cpf': 'https://servicos.receita.fazenda.gov.br/Servicos/CPF/ConsultaSituacao/ConsultaPublica.asp',
+            'sinesp_cidadao': 'https://www.gov.br/pt-br/apps/sinesp-cidadao',
+            'falecidos_brasil': 'https://www.falecidosnobrasil.org.br/index.php',
+            'pessoa_desaparecida': 'https://www.gov.br/pt-br/servicos/consultar-pessoa-desaparecida',
+            'portal_transparencia': 'https://portaldatransparencia.gov.br/',
+            'juntas_comerciais': 'https://www.gov.br/empresas-e-negocios/pt-br/drei/juntas-comerciais',
+            'bcb_oficial': 'https://www.bcb.gov.br/',
+            'detran_pr': 'https://www.detran.pr.gov.br/',
+            'procon_pr': 'https://www.procon.pr.gov.br/'
+        }
+
+    @property
+    def session(self):
+        """
+        Sessão HTTP síncrona, criada no primeiro acesso
+        """
+        if self._session is None:
+            with self._lock_session:
+                if self._session is None:
+                    import requests
+                    session = requests.Session()
+                    session.headers.update(CABECALHOS_PADRAO)
+                    self._session = session
+        return self._session
+
+    @session.setter
+    def session(self, session) -> None:
+        self._session = session
+
+    def _info(self, mensagem: str) -> None:
+        if not self.silencioso:
+            print(f"[INFO] {mensagem}")
+
+    def _timeout_efetivo(self) -> Tuple[float, float]:
+        """
+        Timeouts (conexão, leitura) limitados pelo prazo da fonte em execução na thread atual
+        """
+        prazo = getattr(self._local, 'prazo', None)
+        if prazo is None:
+            return self.timeout_conexao, self.timeout
+        restante = prazo - time.monotonic()
+        return max(0.1, min(self.timeout_conexao, restante)), max(0.1, min(self.timeout, restante))
+
+    def _aguardar_cota(self, host: str) -> float:
+        """
+        Reserva um token do host e retorna a espera necessária, respeitando o prazo da fonte
+        """
+        if getattr(self._local, 'token_reservado', False):
+            # Token já reservado pelo escalonador ao despachar a tarefa
+            self._local.token_reservado = False
+            return 0.0
+        espera = self.limitador.reservar(host)
+        prazo = getattr(self._local, 'prazo', None)
+        if prazo is not None and time.monotonic() + espera > prazo:
+            self.limitador.devolver(host)
+            raise TimeoutError(f"Cota de {host} esgotada até o prazo da fonte")
+        return espera
+
+    def _tratar_rejeicao(self, host: str, response, rejeicoes: int) -> bool:
+        """
+        Registra um HTTP 429 no limitador e indica se vale repetir a requisição
+        """
+        if response.status_code != 429 or self.limitador is None or rejeicoes >= self.max_rejeicoes:
+            return False
+        segundos = _segundos_retry_after(response.headers.get('Retry-After') or response.headers.get('retry-after'))
+        self.limitador.bloquear(host, segundos if segundos is not None else self.limitador.intervalo_padrao(host))
+        return True
+
+    @staticmethod
+    def _registrar_tentativa(repeticao: bool) -> None:
+        """
+        Conta uma requisição (e se é repetição) na chamada de fonte atual
+        """
+        chamada = _CHAMADA_ATUAL.get()
+        if chamada is not None:
+            chamada['requisicoes'] += 1
+            if repeticao:
+                chamada['retentativas'] += 1
+
+    @staticmethod
+    def _registrar_resposta(response) -> None:
+        """
+        Anota status e bytes recebidos na chamada de fonte atual
+        """
+        chamada = _CHAMADA_ATUAL.get()
+        if chamada is not None:
+            chamada['status'] = response.status_code
+            chamada['bytes'] += len(response.content)
+
+    def _anotar_circuito(self, host: str, estado: Optional[str]) -> None:
+        if estado is not None:
+            self.metricas.incrementar('mrholmescorp_circuito_transicoes_total', host=host, estado=estado)
+            self._info(f"Circuito de {host}: {estado}")
+
+    def _permitir_host(self, host: str) -> None:
+        """
+        Falha na hora (CircuitoAberto) se o circuito do host estiver aberto
+        """
+        if self.disjuntor is not None:
+            self._anotar_circuito(host, self.disjuntor.permitir(host))
+
+    def _pausa_retentativa(self, host: str, falhas: int, response=None,
+                           erro: Optional[BaseException] = None) -> Optional[float]:
+        """
+        Registra o desfecho no disjuntor e retorna a pausa antes de repetir (None: não repetir)
+        """
+        status = None if response is None else response.status_code
+        falha = _falha_transitoria(erro) if erro is not None else status >= 500
+        if self.disjuntor is not None:
+            if erro is not None and not falha:
+                self.disjuntor.liberar(host)
+            else:
+                self._anotar_circuito(host, self.disjuntor.registrar(host, not falha))
+        if not falha or falhas >= self.politica.tentativas:
+            return None
+        if not self.politica.repetivel('GET', status, erro):
+            return None
+        if self.disjuntor is not None and self.disjuntor.estado(host) == 'aberto':
+            return None
+        retry_after = None
+        if response is not None:
+            retry_after = _segundos_retry_after(response.headers.get('Retry-After') or response.headers.get('retry-after'))
+        pausa = self.politica.espera(falhas, retry_after)
+        prazo = getattr(self._local, 'prazo', None)
+        if prazo is not None and time.monotonic() + pausa >= prazo:
+            return None
+        return pausa
+
+    def _requisitar(self, url: str):
+        """
+        Ponto único de acesso HTTP das consultas
+
+        Passa pelo disjuntor e pelo limitador do host; 429 é repetido após
+        Retry-After e falhas transitórias com backoff (PoliticaRetentativa).
+        """
+        host = urlsplit(url).hostname
+        rejeicoes = falhas = 0
+        while True:
+            self._permitir_host(host)
+            registrado = False
+            try:
+                if self.limitador is not None:
+                    espera = self._aguardar_cota(host)
+                    if espera > 0:
+                        time.sleep(espera)
+                self._registrar_tentativa(rejeicoes + falhas > 0)
+                try:
+                    response = self.session.get(url, timeout=self._timeout_efetivo())
+                except Exception as e:
+                    falhas += 1
+                    registrado = True
+                    pausa = self._pausa_retentativa(host, falhas, erro=e)
+                    if pausa is None:
+                        raise
+                    time.sleep(pausa)
+                    continue
+                self._registrar_resposta(response)
+                registrado = True
+                pausa = self._pausa_retentativa(host, falhas + 1, response=response)
+            finally:
+                if not registrado and self.disjuntor is not None:
+                    # Sem desfecho (prazo da cota, cancelamento): não prende a sonda do meio-aberto
+                    self.disjuntor.liberar(host)
+            if pausa is not None:
+                falhas += 1
+                time.sleep(pausa)
+                continue
+            if self._tratar_rejeicao(host, response, rejeicoes):
+                rejeicoes += 1
+                continue
+            return response
+
+    async def _requisitar_async(self, url: str):
+        """
+        Equivalente de _requisitar sobre o motor assíncrono
+        """
+        import asyncio
+        host = urlsplit(url).hostname
+        rejeicoes = falhas = 0
+        while True:
+            self._permitir_host(host)
+            registrado = False
+            try:
+                if self.limitador is not None:
+                    espera = self.limitador.reservar(host)
+                    if espera > 0:
+                        await asyncio.sleep(espera)
+                self._registrar_tentativa(rejeicoes + falhas > 0)
+                try:
+                    response = await self.motor.get(url)
+                except Exception as e:
+                    falhas += 1
+                    registrado = True
+                    pausa = self._pausa_retentativa(host, falhas, erro=e)
+                    if pausa is None:
+                        raise
+                    await asyncio.sleep(pausa)
+                    continue
+                self._registrar_resposta(response)
+                registrado = True
+                pausa = self._pausa_retentativa(host, falhas + 1, response=response)
+            finally:
+                if not registrado and self.disjuntor is not None:
+                    # Sem desfecho (prazo da cota, cancelamento): não prende a sonda do meio-aberto
+                    self.disjuntor.liberar(host)
+            if pausa is not None:
+                falhas += 1
+                await asyncio.sleep(pausa)
+                continue
+            if self._tratar_rejeicao(host, response, rejeicoes):
+                rejeicoes += 1
+                continue
+            return response
+
+    @property
+    def motor(self) -> MotorHTTPAssincrono:
+        """
+        Motor HTTP assíncrono compartilhado pelas versões awaitable das consultas
+        """
+        if self._motor is None:
+            self._motor = MotorHTTPAssincrono(timeout=self.timeout, headers=CABECALHOS_PADRAO,
+                                              timeout_conexao=self.timeout_conexao)
+        return self._motor
+
+    @staticmethod
+    def _anotar_cache(acerto: bool) -> None:
+        chamada = _CHAMADA_ATUAL.get()
+        if chamada is not None:
+            chamada['cache'] = 'hit' if acerto else 'miss'
+
+    def _nova_chamada(self) -> Tuple[Dict, contextvars.Token]:
+        chamada = {'requisicoes': 0, 'status': None, 'bytes': 0, 'retentativas': 0, 'cache': None,
+                   'compartilhada': False}
+        return chamada, _CHAMADA_ATUAL.set(chamada)
+
+    def _registrar_chamada(self, fonte: str, chamada: Dict, resultado: Dict, duracao: float) -> None:
+        """
+        Consolida as medições de uma chamada de fonte no registro de métricas
+        """
+        metricas = self.metricas
+        metricas.incrementar('mrholmescorp_consultas_total', fonte=fonte,
+                             resultado=_classificar_resultado(resultado, chamada))
+        metricas.observar('mrholmescorp_consulta_duracao_segundos', duracao, fonte=fonte)
+        if chamada['bytes']:
+            metricas.incrementar('mrholmescorp_bytes_recebidos_total', chamada['bytes'], fonte=fonte)
+        if chamada['status'] is not None:
+            metricas.incrementar('mrholmescorp_http_respostas_total', fonte=fonte, status=chamada['status'])
+        if chamada['retentativas']:
+            metricas.incrementar('mrholmescorp_retentativas_total', chamada['retentativas'], fonte=fonte)
+        if chamada['cache'] is not None:
+            metricas.incrementar('mrholmescorp_cache_total', fonte=fonte, resultado=chamada['cache'])
+
+    def _medir(self, fonte: str, funcao: Callable[[], Dict]) -> Dict:
+        """
+        Executa a consulta de uma fonte registrando tempo, HTTP, cache e resultado
+        """
+        chamada, token = self._nova_chamada()
+        inicio = time.perf_counter()
+        resultado = {"erro": "Consulta interrompida"}
+        try:
+            if self.perfilador is not None:
+                with self.perfilador.ativo():
+                    resultado = funcao()
+            else:
+                resultado = funcao()
+            return resultado
+        finally:
+            _CHAMADA_ATUAL.reset(token)
+            self._registrar_chamada(fonte, chamada, resultado, time.perf_counter() - inicio)
+
+    async def _medir_async(self, fonte: str, corrotina) -> Dict:
+        """
+        Equivalente de _medir para corrotinas (cada tarefa tem seu próprio contexto)
+        """
+        chamada, token = self._nova_chamada()
+        inicio = time.perf_counter()
+        resultado = {"erro": "Consulta interrompida"}
+        try:
+            resultado = await corrotina
+            return resultado
+        finally:
+            _CHAMADA_ATUAL.reset(token)
+            self._registrar_chamada(fonte, chamada, resultado, time.perf_counter() - inicio)
+
+    def _anotar_voo(self, fonte: str, lider: bool) -> None:
+        if not lider:
+            self.metricas.incrementar('mrholmescorp_chamadas_economizadas_total', fonte=fonte)
+            chamada = _CHAMADA_ATUAL.get()
+            if chamada is not None:
+                chamada['compartilhada'] = True
+
+    def _consultar_com_cache(self, fonte: str, chave: str, consultar: Callable[[], Dict],
+                             compactar: Optional[Callable[[Dict], Dict]] = None) -> Dict:
+        """
+        Atende a consulta pelo cache ou executa e armazena o resultado bem-sucedido
+
+        Em falta no cache, chamadas simultâneas da mesma (fonte, chave)
+        aguardam uma única consulta (VooUnico). `compactar` reconstrói o
+        tipo compacto do resultado lido do cache (ex.: RegistroEmpresa.de_dict).
+        """
+        if self.cache is not None and not self.atualizar_cache:
+            resultado = self.cache.obter(fonte, chave)
+            self._anotar_cache(resultado is not None)
+            if resultado is not None:
+                return compactar(resultado) if compactar is not None else resultado
+
+        def consultar_e_gravar() -> Dict:
+            resultado = consultar()
+            if self.cache is not None and "erro" not in resultado:
+                self.cache.gravar(fonte, chave, resultado)
+            return resultado
+
+        if self.voo_unico is None:
+            return consultar_e_gravar()
+        resultado, lider = self.voo_unico.executar((fonte, chave), consultar_e_gravar)
+        self._anotar_voo(fonte, lider)
+        return resultado
+
+    async def _consultar_com_cache_async(self, fonte: str, chave: str, consultar,
+                                         compactar: Optional[Callable[[Dict], Dict]] = None) -> Dict:
+        """
+        Equivalente de _consultar_com_cache para corrotinas
+        """
+        if self.cache is not None and not self.atualizar_cache:
+            resultado = self.cache.obter(fonte, chave)
+            self._anotar_cache(resultado is not None)
+            if resultado is not None:
+                return compactar(resultado) if compactar is not None else resultado
+
+        async def consultar_e_gravar() -> Dict:
+            resultado = await consultar()
+            if self.cache is not None and "erro" not in resultado:
+                self.cache.gravar(fonte, chave, resultado)
+            return resultado
+
+        if self.voo_unico is None:
+            return await consultar_e_gravar()
+        resultado, lider = await self.voo_unico.executar_async((fonte, chave), consultar_e_gravar)
+        self._anotar_voo(fonte, lider)
+        return resultado
+
+    def _interpretar_receitaws(self, url: str, response) -> Dict:
+        """
+        Converte a resposta da ReceitaWS no formato padrão de empresa
+        """
+        data = response.json()
+
+        if response.status_code == 200 and data.get('status') == 'OK':
+            return RegistroEmpresa(
+                fonte="ReceitaWS",
+                cnpj=data.get('cnpj'),
+                razao_social=data.get('nome'),
+                nome_fantasia=data.get('fantasia'),
+                situacao=data.get('situacao'),
+                capital_social=data.get('capital_social'),
+                endereco=Endereco(
+                    logradouro=data.get('logradouro'),
+                    numero=data.get('numero'),
+                    bairro=data.get('bairro'),
+                    municipio=data.get('municipio'),
+                    uf=data.get('uf'),
+                    cep=data.get('cep')
+                ),
+                atividade_principal=[Atividade.de(a) for a in data.get('atividade_principal', [])],
+                atividades_secundarias=[Atividade.de(a) for a in data.get('atividades_secundarias', [])],
+                socios=data.get('qsa', []),
+                url_fonte=url
+            )
+        else:
+            return StatusFonte(data.get('message', 'Erro na consulta'), url_fonte=url)
+
+    def _interpretar_bcb(self, url: str, documento_limpo: str, response) -> Dict:
+        """
+        Converte a resposta da API de valores a receber do BCB
+
+        Um 200 com JSON malformado vira erro, para não ser gravado no cache.
+        """
+        if response.status_code == 200:
+            try:
+                data = response.json()
+            except ValueError:
+                return StatusFonte("Resposta recebida mas não é JSON válido", url_fonte=url,
+                                   url_portal=self.urls['bcb_valores'])
+            return {
+                "fonte": "Banco Central - Valores a Receber",
+                "documento": documento_limpo,
+                "valores": data,
+                "url_fonte": url,
+                "url_portal": self.urls['bcb_valores']
+            }
+        else:
+            return StatusFonte(f"Status HTTP: {response.status_code}", url_fonte=url,
+                               url_portal=self.urls['bcb_valores'])
+
+    def consultar_cnpj_receitaws(self, cnpj: str) -> Dict:
+        """
+        Consulta informações de empresa via CNPJ na ReceitaWS (API pública)
+        """
+        cnpj_limpo = ''.join(filter(str.isdigit, cnpj))
+
+        if len(cnpj_limpo) != 14:
+            return StatusFonte("CNPJ deve ter 14 dígitos")
+
+        url = f"{self.urls['receitaws_api']}{cnpj_limpo}"
+
+        def consultar() -> Dict:
+            try:
+                return self._interpretar_receitaws(url, self._requisitar(url))
+            except Exception as e:
+                return StatusFonte(f"Erro na requisição: {str(e)}", url_fonte=url)
+
+        return self._medir("receitaws", lambda: self._consultar_com_cache("receitaws", cnpj_limpo, consultar,
+                                                                         RegistroEmpresa.de_dict))
+
+    async def consultar_cnpj_receitaws_async(self, cnpj: str) -> Dict:
+        """
+        Versão awaitable de consultar_cnpj_receitaws sobre o motor assíncrono
+        """
+        cnpj_limpo = ''.join(filter(str.isdigit, cnpj))
+
+        if len(cnpj_limpo) != 14:
+            return StatusFonte("CNPJ deve ter 14 dígitos")
+
+        url = f"{self.urls['receitaws_api']}{cnpj_limpo}"
+
+        async def consultar() -> Dict:
+            try:
+                return self._interpretar_receitaws(url, await self._requisitar_async(url))
+            except Exception as e:
+                return StatusFonte(f"Erro na requisição: {str(e)}", url_fonte=url)
+
+        return await self._medir_async(
+            "receitaws", self._consultar_com_cache_async("receitaws", cnpj_limpo, consultar,
+                                                         RegistroEmpresa.de_dict))
+
+    def consultar_cnpj_offline(self, cnpj: str) -> Dict:
+        """
+        Consulta CNPJ na base local gerada a partir dos dados abertos da Receita Federal
+        """
+        return self._medir("cnpj_offline", lambda: self._consultar_cnpj_offline(cnpj))
+
+    def _consultar_cnpj_offline(self, cnpj: str) -> Dict:
+        cnpj_limpo = ''.join(filter(str.isdigit, cnpj))
+
+        if len(cnpj_limpo) != 14:
+            return StatusFonte("CNPJ deve ter 14 dígitos")
+
+        if self.base_offline is None:
+            return StatusFonte("Base CNPJ offline não configurada (use --base-offline)")
+
+        try:
+            resultado = self.base_offline.consultar(cnpj_limpo)
+        except Exception as e:
+            return StatusFonte(f"Erro na base offline: {str(e)}")
+
+        if resultado is None:
+            return StatusFonte("CNPJ não encontrado na base offline",
+                               url_fonte=f"file://{os.path.abspath(self.base_offline.diretorio)}")
+        return resultado
+
+    def consultar_valores_receber_bcb(self, cpf_cnpj: str) -> Dict:
+        """
+        Consulta valores a receber no Banco Central
+        """
+        documento_limpo = ''.join(filter(str.isdigit, cpf_cnpj))
+
+        # Formato da API do BCB para valores a receber
+        url = f"{self.urls['bcb_api']}{documento_limpo}/1960-12-01"
+
+        def consultar() -> Dict:
+            try:
+                return self._interpretar_bcb(url, documento_limpo, self._requisitar(url))
+            except Exception as e:
+                return StatusFonte(f"Erro na requisição: {str(e)}", url_fonte=url,
+                                   url_portal=self.urls['bcb_valores'])
+
+        return self._medir("bcb_valores",
+                           lambda: self._consultar_com_cache("bcb_valores", documento_limpo, consultar))
+
+    async def consultar_valores_receber_bcb_async(self, cpf_cnpj: str) -> Dict:
+        """
+        Versão awaitable de consultar_valores_receber_bcb sobre o motor assíncrono
+        """
+        documento_limpo = ''.join(filter(str.isdigit, cpf_cnpj))
+        url = f"{self.urls['bcb_api']}{documento_limpo}/1960-12-01"
+
+        async def consultar() -> Dict:
+            try:
+                return self._interpretar_bcb(url, documento_limpo, await self._requisitar_async(url))
+            except Exception as e:
+                return StatusFonte(f"Erro na requisição: {str(e)}", url_fonte=url,
+                                   url_portal=self.urls['bcb_valores'])
+
+        return await self._medir_async(
+            "bcb_valores", self._consultar_com_cache_async("bcb_valores", documento_limpo, consultar))
+
+    async def fechar_async(self) -> None:
+        """
+        Libera as conexões mantidas pelo motor assíncrono
+        """
+        if self._motor is not None:
+            await self._motor.fechar()
+
+    def _referencia(self, nome: str, campos: Callable[[], Iterable[Tuple[str, object]]],
+                    *valores) -> ReferenciaEstatica:
+        """
+        Resultado de fonte estática sobre o modelo `nome`, montado no primeiro uso
+
+        `campos` lista (chave, valor) na ordem do resultado; chaves com valor
+        _VARIAVEL recebem, em ordem, os `valores` desta consulta.
+        """
+        modelo = self._modelos.get(nome)
+        if modelo is None:
+            modelo = self._modelos[nome] = _ModeloReferencia(campos())
+        return ReferenciaEstatica(modelo, valores)
+
+    def consultar_portal_transparencia(self, termo: str, tipo: str = "pessoa") -> Dict:
+        """
+        Consulta no Portal da Transparência
+        """
+        try:
+            # Simulação de consulta - implementar com APIs reais quando disponíveis
+            return self._referencia("portal_transparencia", lambda: (
+                ("fonte", "Portal da Transparência"),
+                ("termo_busca", _VARIAVEL),
+                ("tipo", _VARIAVEL),
+                ("status", "Consulta estruturada - implementar com API oficial"),
+                ("url_portal", self.urls['portal_transparencia']),
+                ("observacao", "Acessar manualmente o portal para consultas específicas")
+            ), termo, tipo)
+        except Exception as e:
+            return StatusFonte(f"Erro na consulta: {str(e)}", url_portal=self.urls['portal_transparencia'])
+
+    def consultar_caixa_beneficios(self, cpf: str) -> Dict:
+        """
+        Estrutura para consulta de benefícios sociais da Caixa
+        """
+        cpf_limpo = ''.join(filter(str.isdigit, cpf))
+
+        return self._referencia("caixa_beneficios", lambda: (
+            ("fonte", "Caixa Econômica Federal - Benefícios Sociais"),
+            ("cpf", _VARIAVEL),
+            ("status", "Consulta manual necessária"),
+            ("url_programas", self.urls['caixa_programas']),
+            ("url_beneficios", self.urls['caixa_beneficios']),
+            ("observacao", "Acessar os portais da Caixa para consulta manual")
+        ), cpf_limpo)
+
+    def consultar_auxilio_emergencial(self, cpf: str) -> Dict:
+        """
+        Estrutura para consulta do auxílio emergencial
+        """
+        cpf_limpo = ''.join(filter(str.isdigit, cpf))
+
+        return self._referencia("auxilio_emergencial", lambda: (
+            ("fonte", "Auxílio Emergencial - Ministério da Cidadania"),
+            ("cpf", _VARIAVEL),
+            ("status", "Consulta manual necessária"),
+            ("url_consulta", self.urls['auxilio_emergencial']),
+            ("observacao", "Acessar o portal para consulta manual do auxílio")
+        ), cpf_limpo)
+
+    def consultar_receita_federal(self, documento: str, tipo: str) -> Dict:
+        """
+        Estrutura para consultas na Receita Federal
+        """
+        documento_limpo = ''.join(filter(str.isdigit, documento))
+
+        if tipo == "cnpj":
+            modelo, url_consulta = "receita_federal_cnpj", 'receita_cnpj_oficial'
+        else:
+            modelo, url_consulta = "receita_federal_cpf", 'receita_cpf'
+
+        return self._referencia(modelo, lambda: (
+            ("fonte", "Receita Federal do Brasil"),
+            ("documento", _VARIAVEL),
+            ("tipo", _VARIAVEL),
+            ("status", "Consulta manual necessária"),
+            ("url_consulta", self.urls[url_consulta]),
+            ("observacao", "Acessar o portal da Receita Federal para consulta oficial")
+        ), documento_limpo, tipo)
+
+    def consultar_sp_policia_rg(self, rg: str) -> Dict:
+        """
+        Estrutura para consulta de RG na Polícia Civil de SP
+        """
+        return self._referencia("sp_policia_rg", lambda: (
+            ("fonte", "Polícia Civil de São Paulo"),
+            ("rg", _VARIAVEL),
+            ("status", "Consulta manual necessária"),
+            ("url_consulta", self.urls['sp_policia_rg']),
+            ("observacao", "Acessar o portal da Polícia Civil de SP para consulta do RG")
+        ), rg)
+
+    def consultar_sp_transparencia(self, nome: str) -> Dict:
+        """
+        Estrutura para consulta de servidores públicos de SP
+        """
+        return self._referencia("sp_transparencia", lambda: (
+            ("fonte", "Transparência São Paulo - Servidores"),
+            ("nome", _VARIAVEL),
+            ("status", "Consulta manual necessária"),
+            ("url_consulta", self.urls['sp_transparencia']),
+            ("observacao", "Acessar o portal para consulta de servidores públicos de SP")
+        ), nome)
+
+    def consultar_sinesp_cidadao(self, placa: str = None) -> Dict:
+        """
+        Estrutura para consulta no SINESP Cidadão
+        """
+        return self._referencia("sinesp_cidadao", lambda: (
+            ("fonte", "SINESP Cidadão"),
+            ("placa", _VARIAVEL),
+            ("status", "Aplicativo necessário"),
+            ("url_info", self.urls['sinesp_cidadao']),
+            ("observacao", "Baixar o aplicativo SINESP Cidadão para consultas")
+        ), placa)
+
+    def consultar_falecidos_brasil(self, nome: str) -> Dict:
+        """
+        Estrutura para consulta de falecidos no Brasil
+        """
+        return self._referencia("falecidos_brasil", lambda: (
+            ("fonte", "Falecidos no Brasil"),
+            ("nome", _VARIAVEL),
+            ("status", "Consulta manual necessária"),
+            ("url_consulta", self.urls['falecidos_brasil']),
+            ("observacao", "Acessar o site para consulta de registros de óbito")
+        ), nome)
+
+    def consultar_pessoa_desaparecida(self, nome: str) -> Dict:
+        """
+        Estrutura para consulta de pessoas desaparecidas
+        """
+        return self._referencia("pessoa_desaparecida", lambda: (
+            ("fonte", "Consulta Pessoa Desaparecida - Gov.br"),
+            ("nome", _VARIAVEL),
+            ("status", "Consulta manual necessária"),
+            ("url_consulta", self.urls['pessoa_desaparecida']),
+            ("observacao", "Acessar o portal gov.br para consulta de pessoas desaparecidas")
+        ), nome)
+
+    def consultar_detran_pr(self, info: str) -> Dict:
+        """
+        Estrutura para consultas no DETRAN-PR
+        """
+        return self._referencia("detran_pr", lambda: (
+            ("fonte", "DETRAN Paraná"),
+            ("info", _VARIAVEL),
+            ("status", "Consulta manual necessária"),
+            ("url_consulta", self.urls['detran_pr']),
+            ("observacao", "Acessar o portal do DETRAN-PR para consultas veiculares")
+        ), info)
+
+    def consultar_procon_pr(self, empresa: str) -> Dict:
+        """
+        Estrutura para consultas no PROCON-PR
+        """
+        return self._referencia("procon_pr", lambda: (
+            ("fonte", "PROCON Paraná"),
+            ("empresa", _VARIAVEL),
+            ("status", "Consulta manual necessária"),
+            ("url_consulta", self.urls['procon_pr']),
+            ("observacao", "Acessar o portal do PROCON-PR para consultas sobre reclamações")
+        ), empresa)
+
+    def listar_fontes_dados_abertos(self) -> Dict:
+        """
+        Lista todas as fontes de dados abertos disponíveis
+        """
+        fontes_dados = {
+            "dados_gov": {
+                "nome": "Dados.gov.br",
+                "url": self.urls['dados_gov'],
+                "descricao": "Portal oficial de dados abertos do governo federal"
+            },
+            "brasil_io": {
+                "nome": "Brasil.io",
+                "url": self.urls['brasil_io'],
+                "descricao": "Datasets organizados sobre o Brasil"
+            },
+            "ibict_dados": {
+                "nome": "IBICT Dados",
+                "url": self.urls['ibict_dados'],
+                "descricao": "Instituto Brasileiro de Informação em Ciência e Tecnologia"
+            },
+            "bcb_dados": {
+                "nome": "BCB Dados Abertos",
+                "url": self.urls['bcb_dados'],
+                "descricao": "Dados abertos do Banco Central do Brasil"
+            },
+            "turismo_dados": {
+                "nome": "Dados Turismo",
+                "url": self.urls['turismo_dados'],
+                "descricao": "Dados do Ministério do Turismo"
+            },
+            "mj_dados": {
+                "nome": "Dados MJ",
+                "url": self.urls['mj_dados'],
+                "descricao": "Dados do Ministério da Justiça"
+            },
+            "sc_dados": {
+                "nome": "Dados SC",
+                "url": self.urls['sc_dados'],
+                "descricao": "Dados abertos do estado de Santa Catarina"
+            }
+        }
+
+        return {
+            "fonte": "Repositórios de Dados Abertos",
+            "fontes_disponiveis": fontes_dados,
+            "total_fontes": len(fontes_dados)
+        }
+
+    def listar_ferramentas_osint(self) -> Dict:
+        """
+        Lista ferramentas OSINT disponíveis
+        """
+        ferramentas = {
+            "scan_user": {
+                "nome": "Scan User",
+                "url": self.urls['scan_user_repo'],
+                "descricao": "Ferramenta para scan de usuários"
+            },
+            "osint_brasil": {
+                "nome": "OSINT Kit Brasil",
+                "url": self.urls['osint_brasil_repo'],
+                "descricao": "Kit de ferramentas OSINT focado no Brasil"
+            },
+            "omnisci_demo": {
+                "nome": "OmniSci Tweet Map",
+                "url": self.urls['omnisci_demo'],
+                "descricao": "Demo de visualização de dados de tweets"
+            }
+        }
+
+        return {
+            "fonte": "Ferramentas OSINT",
+            "ferramentas_disponiveis": ferramentas,
+            "total_ferramentas": len(ferramentas)
+        }
+
+    def catalogos_estaticos(self) -> Dict:
+        """
+        Catálogos fixos anexados a cada busca completa
+
+        Montados no primeiro uso e compartilhados (somente leitura) por todos
+        os resultados do consultor.
+        """
+        if self._catalogos is None:
+            self._catalogos = {
+                "urls_referencias": self.urls,
+                "dados_abertos": self.listar_fontes_dados_abertos(),
+                "ferramentas_osint": self.listar_ferramentas_osint()
+            }
+        return self._catalogos
+
+    def gerar_relatorio(self, dados: Dict, arquivo: str = None, formato: str = "json",
+                        compressao: Optional[str] = None) -> None:
+        """
+        Gera relatório das consultas realizadas
+
+        formato="jsonl" grava o resultado compacto em uma linha, com os
+        catálogos estáticos em um manifesto à parte (ver EscritorRelatorios).
+        """
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        if not arquivo:
+            arquivo = f"relatorio_mr_holmescorp_{timestamp}.{formato}"
+
+        if formato == "jsonl":
+            escritor = EscritorRelatorios(arquivo, self.catalogos_estaticos(), compressao=compressao)
+            try:
+                escritor.escrever(dados)
+            finally:
+                escritor.fechar()
+            print(f"[INFO] Manifesto dos catálogos em: {escritor.arquivo_manifesto}")
+        else:
+            with _abrir_saida(arquivo, compressao) as f:
+                json.dump(dados, f, ensure_ascii=False, indent=2, default=_serializar_json)
+
+        print(f"[INFO] Relatório salvo em: {arquivo}")
+
+    def _host_fonte(self, chave: str) -> Optional[str]:
+        """
+        Host consultado pela fonte, ou None para fontes estáticas
+        """
+        fonte = REGISTRO_FONTES.get(chave)
+        if fonte is None or not fonte.rede:
+            return None
+        return urlsplit(self.urls[fonte.url]).hostname
+
+    def _executar_consultas(self, consultas: List[Tuple[str, str, Callable[[], Dict]]],
+                            paralelo: bool = False,
+                            timeout_fonte: Union[float, Dict[str, float], None] = None,
+                            timeout_total: Optional[float] = None) -> Dict[str, Dict]:
+        """
+        Executa as consultas planejadas, em sequência ou em paralelo com prazos
+
+        Com um escalonador configurado as fontes de rede sempre são
+        despachadas por host, mesmo sem paralelo=True.
+        """
+        resultados = {}
+        if not paralelo and self.escalonador is None:
+            for chave, mensagem, funcao in consultas:
+                self._info(f"{mensagem}...")
+                resultados[chave] = funcao()
+            return resultados
+
+        inicio = time.monotonic()
+        prazos = {}
+        for chave, _, _ in consultas:
+            limite = timeout_fonte.get(chave) if isinstance(timeout_fonte, dict) else timeout_fonte
+            candidatos = [t for t in (limite, timeout_total) if t is not None]
+            prazos[chave] = inicio + min(candidatos) if candidatos else None
+
+        def executar(chave: str, funcao: Callable[[], Dict], token_reservado: bool = False) -> Dict:
+            self._local.prazo = prazos[chave]
+            self._local.token_reservado = token_reservado
+            try:
+                return funcao()
+            finally:
+                if self._local.token_reservado:
+                    # Nenhuma requisição consumiu o token (cache ou voo coalescido)
+                    self.escalonador.devolver(self._host_fonte(chave))
+                self._local.prazo = None
+                self._local.token_reservado = False
+
+        from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturoTimeoutError
+        self._info(f"Disparando {len(consultas)} consultas em paralelo...")
+        executor = ThreadPoolExecutor(max_workers=max(1, len(consultas)),
+                                      thread_name_prefix='mrholmescorp')
+        try:
+            futuros = {}
+            for chave, mensagem, funcao in consultas:
+                self._info(f"{mensagem}...")
+                host = self._host_fonte(chave)
+                if self.escalonador is not None and host is not None:
+                    futuros[chave] = self.escalonador.submeter(
+                        host, lambda chave=chave, funcao=funcao: executar(chave, funcao, True))
+                else:
+                    futuros[chave] = executor.submit(executar, chave, funcao)
+
+            for chave, _, _ in consultas:
+                prazo = prazos[chave]
+                espera = None if prazo is None else max(0.0, prazo - time.monotonic())
+                try:
+                    resultados[chave] = futuros[chave].result(timeout=espera)
+                except FuturoTimeoutError:
+                    futuros[chave].cancel()
+                    self.metricas.incrementar('mrholmescorp_fontes_expiradas_total', fonte=chave)
+                    resultados[chave] = StatusFonte("Tempo limite excedido", status="timeout",
+                                                    tempo_limite=round(prazo - inicio, 3))
+                except Exception as e:
+                    resultados[chave] = StatusFonte(f"Erro na consulta: {str(e)}")
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        return resultados
+
+    def buscar_completa(self, identificador: str, tipo: str, paralelo: bool = False,
+                        timeout_fonte: Union[float, Dict[str, float], None] = None,
+                        timeout_total: Optional[float] = None,
+                        incluir_catalogos: bool = True,
+                        fontes: Optional[Iterable[str]] = None) -> Dict:
+        """
+        Realiza busca completa em todas as fontes disponíveis
+
+        Com paralelo=True todas as fontes do tipo são disparadas ao mesmo tempo;
+        timeout_fonte (segundos, global ou por chave de fonte) e timeout_total
+        limitam a espera e fontes que estouram o prazo retornam status "timeout".
+        Com incluir_catalogos=False os catálogos estáticos (urls_referencias,
+        dados_abertos, ferramentas_osint) ficam de fora do resultado. As fontes
+        vêm do REGISTRO_FONTES; `fontes` restringe a execução (ver planejar_fontes).
+        """
+        resultados = {
+            "identificador": identificador,
+            "tipo": tipo,
+            "timestamp": datetime.now().isoformat(),
+            "fontes": {}
+        }
+        if incluir_catalogos:
+            resultados["urls_referencias"] = self.urls
+
+        self._info(f"Iniciando busca completa para {tipo}: {identificador}")
+
+        def consultar(fonte: FonteDados) -> Dict:
+            if fonte.medida:
+                return fonte.consultar(self, identificador, tipo)
+            return self._medir(fonte.chave, lambda: fonte.consultar(self, identificador, tipo))
+
+        consultas = [(fonte.chave, fonte.mensagem, lambda fonte=fonte: consultar(fonte))
+                     for fonte in planejar_fontes(tipo, fontes)]
+
+        resultados["fontes"] = self._executar_consultas(consultas, paralelo, timeout_fonte, timeout_total)
+
+        expiradas = [chave for chave, dados in resultados["fontes"].items() if dados.get("status") == "timeout"]
+        if expiradas:
+            resultados["parcial"] = True
+            resultados["fontes_expiradas"] = expiradas
+
+        if incluir_catalogos:
+            catalogos = self.catalogos_estaticos()
+            # Adicionar informações sobre fontes de dados abertos
+            self._info("Listando fontes de dados abertos...")
+            resultados["fontes"]["dados_abertos"] = catalogos["dados_abertos"]
+
+            self._info("Listando ferramentas OSINT...")
+            resultados["fontes"]["ferramentas_osint"] = catalogos["ferramentas_osint"]
+
+        return resultados
+
+    def _buscar_item_lote(self, identificador: str, tipo: str, opcoes_busca: Dict) -> Tuple[Dict, bool]:
+        """
+        buscar_completa de um item do lote; exceções viram um resultado com erro
+        """
+        try:
+            resultado = self.buscar_completa(identificador, tipo, **opcoes_busca)
+            return resultado, _resultado_com_erro(resultado)
+        except Exception as e:
+            return {"identificador": identificador, "tipo": tipo, "erro": f"Erro durante a busca: {str(e)}"}, True
+
+    def processar_lote(self, identificadores: Iterable[str], tipo: str, escritor: 'EscritorRelatorios',
+                       concorrencia: int = 4, tamanho_fila: Optional[int] = None,
+                       concluidos: Optional[Iterable[str]] = None, exportadores: Iterable = (),
+                       **opcoes_busca) -> Dict[str, int]:
+        """
+        Executa buscar_completa para cada identificador e grava um JSON por linha
+
+        Os identificadores são consumidos sob demanda por uma fila limitada, de
+        modo que o uso de memória não depende do tamanho da entrada; cada
+        resultado é gravado assim que termina (ordem de conclusão). Com um
+        escritor compacto os catálogos estáticos nem chegam a ser montados.
+        Identificadores em concluidos (ex.: de um DiarioLote) são pulados.
+        Cada exportador (ex.: ExportadorCSV) recebe o resultado antes do
+        escritor, que o registra no diário por último. Se uma gravação falhar
+        (ex.: disco cheio), o lote para de ler a entrada e a primeira exceção
+        é relançada depois que as threads terminam.
+        """
+        opcoes_busca.setdefault("incluir_catalogos", not escritor.compacto)
+        concluidos = concluidos or ()
+        exportadores = tuple(exportadores)
+        fila = queue.Queue(maxsize=tamanho_fila or concorrencia * 2)
+        parar = threading.Event()
+        lock_contadores = threading.Lock()
+        contadores = {"processados": 0, "com_erro": 0, "pulados": 0}
+        erros = []
+        fim = object()
+
+        def trabalhador() -> None:
+            while True:
+                identificador = fila.get()
+                if identificador is fim:
+                    return
+                if parar.is_set():
+                    # Continua esvaziando a fila para o produtor não travar em put()
+                    continue
+                resultado, com_erro = self._buscar_item_lote(identificador, tipo, opcoes_busca)
+                try:
+                    for exportador in exportadores:
+                        exportador.escrever(resultado)
+                    escritor.escrever(resultado)
+                except Exception as e:
+                    with lock_contadores:
+                        erros.append(e)
+                    parar.set()
+                    continue
+                with lock_contadores:
+                    contadores["processados"] += 1
+                    if com_erro:
+                        contadores["com_erro"] += 1
+
+        threads = [threading.Thread(target=trabalhador, name=f"mrholmescorp-lote-{i}", daemon=True)
+                   for i in range(max(1, concorrencia))]
+        for thread in threads:
+            thread.start()
+
+        try:
+            for identificador in identificadores:
+                if parar.is_set():
+                    break
+                if identificador in concluidos:
+                    contadores["pulados"] += 1
+                    continue
+                fila.put(identificador)
+        except BaseException:
+            parar.set()
+            raise
+        finally:
+            for _ in threads:
+                fila.put(fim)
+            for thread in threads:
+                thread.join()
+
+        if erros:
+            raise erros[0]
+        return contadores
+
+
+class FonteDados(NamedTuple):
+    """
+    Declaração de uma fonte consultada por buscar_completa
+
+    `consultar` recebe (consultor, identificador, tipo); `url` é a chave em
+    MrHolmesCorp.urls do host consultado pelas fontes de rede. Custo
+    ("gratuita" ou "cota") e latência ("imediata" ou "rede") orientam o
+    planejamento; `ttl` é o padrão do cache para a fonte. Fontes com
+    padrao=False só rodam quando escolhidas explicitamente. Com medida=True
+    a própria consulta registra suas métricas (_medir); nas demais,
+    buscar_completa mede a chamada.
+    """
+    chave: str
+    mensagem: str
+    tipos: Tuple[str, ...]
+    consultar: Callable[['MrHolmesCorp', str, str], Dict]
+    rede: bool = False
+    url: Optional[str] = None
+    custo: str = "gratuita"
+    latencia: str = "imediata"
+    ttl: Optional[float] = None
+    padrao: bool = True
+    medida: bool = False
+
+
+REGISTRO_FONTES: Dict[str, FonteDados] = OrderedDict()
+
+
+def registrar_fonte(fonte: FonteDados) -> FonteDados:
+    """
+    Adiciona (ou substitui) uma fonte no registro usado por buscar_completa
+    """
+    REGISTRO_FONTES[fonte.chave] = fonte
+    return fonte
+
+
+def planejar_fontes(tipo: str, selecao: Optional[Iterable[str]] = None) -> List[FonteDados]:
+    """
+    Fontes registradas que se aplicam ao tipo, na ordem de registro
+
+    `selecao` lista chaves a executar; chaves com prefixo "^" são excluídas
+    (somente exclusões partem das fontes padrão do tipo). O prefixo "-"
+    também é aceito, mas na linha de comando só funciona como --fontes=-chave.
+    """
+    fontes = [fonte for fonte in REGISTRO_FONTES.values() if tipo in fonte.tipos]
+    if selecao is None:
+        return [fonte for fonte in fontes if fonte.padrao]
+
+    incluir, excluir = set(), set()
+    for chave in selecao:
+        chave = chave.strip()
+        if not chave:
+            continue
+        alvo = excluir if chave.startswith(('^', '-')) else incluir
+        chave = chave.lstrip('^-')
+        if chave not in REGISTRO_FONTES:
+            raise ValueError(f"Fonte desconhecida: {chave}")
+        alvo.add(chave)
+
+    return [fonte for fonte in fontes
+            if (fonte.chave in incluir if incluir else fonte.padrao) and fonte.chave not in excluir]
+
+
+for _fonte in (
+    FonteDados("receitaws", "Consultando CNPJ via ReceitaWS", ("cnpj",),
+               lambda c, identificador, tipo: c.consultar_cnpj_receitaws(identificador),
+               rede=True, url="receitaws_api", custo="cota", latencia="rede", ttl=7 * 24 * 3600, medida=True),
+    FonteDados("cnpj_offline", "Consultando base CNPJ offline", ("cnpj",),
+               lambda c, identificador, tipo: c.consultar_cnpj_offline(identificador), padrao=False,
+               medida=True),
+    FonteDados("receita_federal", "Consultando Receita Federal", ("cnpj", "cpf"),
+               lambda c, identificador, tipo: c.consultar_receita_federal(identificador, tipo)),
+    FonteDados("bcb_valores", "Consultando valores a receber BCB", ("cnpj", "cpf"),
+               lambda c, identificador, tipo: c.consultar_valores_receber_bcb(identificador),
+               rede=True, url="bcb_api", custo="cota", latencia="rede", ttl=24 * 3600, medida=True),
+    FonteDados("caixa_beneficios", "Consultando benefícios Caixa", ("cpf",),
+               lambda c, identificador, tipo: c.consultar_caixa_beneficios(identificador)),
+    FonteDados("auxilio_emergencial", "Consultando auxílio emergencial", ("cpf",),
+               lambda c, identificador, tipo: c.consultar_auxilio_emergencial(identificador)),
+    FonteDados("transparencia", "Consultando Portal da Transparência", ("cnpj", "cpf"),
+               lambda c, identificador, tipo: c.consultar_portal_transparencia(
+                   identificador, "empresa" if tipo == "cnpj" else "pessoa")),
+    FonteDados("sp_transparencia", "Consultando transparência SP", ("nome",),
+               lambda c, identificador, tipo: c.consultar_sp_transparencia(identificador)),
+    FonteDados("falecidos", "Consultando falecidos Brasil", ("nome",),
+               lambda c, identificador, tipo: c.consultar_falecidos_brasil(identificador)),
+    FonteDados("pessoa_desaparecida", "Consultando pessoa desaparecida", ("nome",),
+               lambda c, identificador, tipo: c.consultar_pessoa_desaparecida(identificador)),
+    FonteDados("sp_policia_rg", "Consultando RG SP", ("rg",),
+               lambda c, identificador, tipo: c.consultar_sp_policia_rg(identificador)),
+    FonteDados("sinesp", "Consultando SINESP", ("placa",),
+               lambda c, identificador, tipo: c.consultar_sinesp_cidadao(identificador)),
+    FonteDados("detran_pr", "Consultando DETRAN-PR", ("placa",),
+               lambda c, identificador, tipo: c.consultar_detran_pr(identificador)),
+):
+    registrar_fonte(_fonte)
+
+
+def _abrir_saida(arquivo: str, compressao: Optional[str] = None) -> TextIO:
+    """
+    Abre arquivo texto UTF-8 para escrita, com compressão gzip ou zstd opcional
+
+    Sem compressão explícita, a extensão .gz ou .zst define o formato.
+    """
+    if compressao is None:
+        if arquivo.endswith('.gz'):
+            compressao = 'gzip'
+        elif arquivo.endswith('.zst'):
+            compressao = 'zstd'
+
+    if compressao == 'gzip':
+        import gzip
+        return gzip.open(arquivo, 'wt', encoding='utf-8', compresslevel=6)
+    if compressao == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("Compressão zstd requer o pacote 'zstandard' (pip3 install zstandard)")
+        return zstandard.open(arquivo, 'wt', encoding='utf-8')
+    return open(arquivo, 'w', encoding='utf-8')
+
+
+def _resultado_com_erro(resultado: Dict) -> bool:
+    """
+    Indica se a busca falhou por inteiro ou se alguma fonte devolveu erro
+    """
+    if "erro" in resultado:
+        return True
+    return any("erro" in dados for dados in resultado.get("fontes", {}).values())
+
+
+def _linha_jsonl(resultado: Dict, referencia_manifesto: Optional[str] = None) -> str:
+    if referencia_manifesto is not None:
+        resultado = dict(resultado, manifesto=referencia_manifesto)
+    return json.dumps(resultado, ensure_ascii=False, separators=(',', ':'), default=_serializar_json) + "\n"
+
+
+def _anexar(descritor: int, dados: bytes) -> None:
+    while dados:
+        dados = dados[os.write(descritor, dados):]
+
+
+class DiarioLote:
+    """
+    Diário de checkpoint do modo lote, gravado ao lado da saída JSONL
+
+    Cada linha registra "ok" ou "falha", o byte em que termina o resultado
+    na saída e o identificador. As gravações vão direto ao descritor, então
+    sobrevivem à morte do processo; o fsync (da saída e depois do diário)
+    acontece a cada intervalo_sync segundos e no fechamento. Ao retomar, linhas
+    truncadas e registros que apontam além do fim da saída são descartados.
+    Identificadores repetidos (falhas já refeitas) ficam em `refeitos` com o
+    fim do registro mais recente, o único que resultados_vigentes() considera.
+    """
+
+    CABECALHO = "#mrholmescorp-diario\t1"
+
+    def __init__(self, arquivo_saida: str, tipo: str, retomar: bool = False, intervalo_sync: float = 1.0):
+        self.arquivo = f"{arquivo_saida}.diario"
+        self.arquivo_saida = arquivo_saida
+        self.tipo = tipo
+        self.intervalo_sync = intervalo_sync
+        self.concluidos = set()
+        self.falhas = set()
+        self.refeitos = {}
+        self.fim_saida = 0
+        self._ultimo_sync = time.monotonic()
+        self._pendente = False
+
+        if retomar and os.path.exists(self.arquivo):
+            self._descritor = os.open(self.arquivo, os.O_RDWR)
+            try:
+                self._carregar()
+            except BaseException:
+                os.close(self._descritor)
+                raise
+            os.lseek(self._descritor, 0, os.SEEK_END)
+        else:
+            if retomar and os.path.exists(arquivo_saida) and os.path.getsize(arquivo_saida):
+                raise ValueError(f"{self.arquivo} não existe; sem ele não é possível retomar {arquivo_saida}")
+            self._descritor = os.open(self.arquivo, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            _anexar(self._descritor, f"{self.CABECALHO}\t{tipo}\n".encode('utf-8'))
+
+    def _carregar(self) -> None:
+        with open(self.arquivo, 'rb') as f:
+            conteudo = f.read()
+        tamanho_saida = os.path.getsize(self.arquivo_saida) if os.path.exists(self.arquivo_saida) else 0
+
+        linhas = conteudo.split(b'\n')
+        cabecalho = linhas[0].decode('utf-8', 'replace').split('\t')
+        if len(linhas) < 2 or '\t'.join(cabecalho[:2]) != self.CABECALHO:
+            raise ValueError(f"{self.arquivo} não é um diário de lote")
+        if cabecalho[2:] != [self.tipo]:
+            raise ValueError(f"{self.arquivo} é de um lote do tipo {':'.join(cabecalho[2:]) or '?'}, não {self.tipo}")
+
+        valido = len(linhas[0]) + 1
+        # A última posição do split é a sobra após o último "\n": vazia ou truncada
+        for linha in linhas[1:-1]:
+            estado, _, resto = linha.decode('utf-8').partition('\t')
+            fim, _, identificador = resto.partition('\t')
+            if estado not in ('ok', 'falha') or not fim.isdigit() or int(fim) > tamanho_saida:
+                break
+            if identificador in self.concluidos or identificador in self.falhas:
+                self.refeitos[identificador] = int(fim)
+            (self.concluidos if estado == 'ok' else self.falhas).add(identificador)
+            (self.falhas if estado == 'ok' else self.concluidos).discard(identificador)
+            self.fim_saida = int(fim)
+            valido += len(linha) + 1
+        os.ftruncate(self._descritor, valido)
+
+    def resultados_vigentes(self) -> Iterator[Dict]:
+        """
+        Lê da saída retomada o resultado mais recente de cada identificador que não será repetido
+        """
+        posicao = 0
+        with open(self.arquivo_saida, 'rb') as f:
+            for linha in f:
+                posicao += len(linha)
+                if posicao > self.fim_saida:
+                    break
+                resultado = json.loads(linha)
+                identificador = resultado.get("identificador", "")
+                if identificador in self.falhas or self.refeitos.get(identificador, posicao) != posicao:
+                    continue
+                yield resultado
+
+    def registrar(self, identificador: str, ok: bool, fim: int) -> None:
+        _anexar(self._descritor, f"{'ok' if ok else 'falha'}\t{fim}\t{identificador}\n".encode('utf-8'))
+        self._pendente = True
+
+    def sincronizacao_devida(self) -> bool:
+        return self._pendente and time.monotonic() - self._ultimo_sync >= self.intervalo_sync
+
+    def sincronizar(self) -> None:
+        os.fsync(self._descritor)
+        self._ultimo_sync = time.monotonic()
+        self._pendente = False
+
+    def fechar(self) -> None:
+        self.sincronizar()
+        os.close(self._descritor)
+
+
+class EscritorRelatorios:
+    """
+    Grava resultados como JSONL compacto, um por linha, à medida que chegam
+
+    Os catálogos estáticos (urls_referencias, dados_abertos,
+    ferramentas_osint) são gravados uma única vez em um manifesto JSON e
+    cada linha aponta para ele pelo campo "manifesto" (arquivo@versão).
+    Com compacto=False as linhas levam os resultados completos.
+
+    Com um DiarioLote, cada linha é anexada à saída em uma única escrita no
+    descritor e registrada no diário sob o mesmo lock; ao retomar, a saída é
+    cortada no fim do último resultado registrado.
+    """
+
+    def __init__(self, arquivo: str, catalogos: Optional[Dict] = None, compressao: Optional[str] = None,
+                 arquivo_manifesto: Optional[str] = None, compacto: bool = True,
+                 diario: Optional[DiarioLote] = None):
+        self.arquivo = arquivo
+        self.compacto = compacto
+        self.diario = diario
+        self.escritos = 0
+        self.referencia_manifesto = None
+        self.arquivo_manifesto = None
+        self._lock = threading.Lock()
+
+        if compacto and catalogos is not None:
+            import hashlib
+            conteudo = json.dumps(catalogos, ensure_ascii=False, sort_keys=True)
+            versao = hashlib.sha1(conteudo.encode('utf-8')).hexdigest()[:12]
+            if arquivo_manifesto is None:
+                base = 'mr_holmescorp' if arquivo == '-' else re.sub(r'(\.jsonl?)?(\.gz|\.zst)?$', '', arquivo)
+                arquivo_manifesto = f"{base}.manifesto.json"
+            with open(arquivo_manifesto, 'w', encoding='utf-8') as f:
+                json.dump({"versao": versao, "gerado_em": datetime.now().isoformat(), "catalogos": catalogos},
+                          f, ensure_ascii=False, indent=2)
+            self.arquivo_manifesto = arquivo_manifesto
+            self.referencia_manifesto = f"{os.path.basename(arquivo_manifesto)}@{versao}"
+
+        if diario is not None:
+            if arquivo == '-' or compressao is not None or arquivo.endswith(('.gz', '.zst')):
+                raise ValueError("o diário de lote requer saída em arquivo sem compressão")
+            self._saida = None
+            self._descritor = os.open(arquivo, os.O_WRONLY | os.O_CREAT, 0o644)
+            os.ftruncate(self._descritor, diario.fim_saida)
+            self._posicao = os.lseek(self._descritor, 0, os.SEEK_END)
+        else:
+            self._saida = sys.stdout if arquivo == '-' else _abrir_saida(arquivo, compressao)
+
+    def escrever(self, resultado: Dict) -> None:
+        self.escrever_linha(_linha_jsonl(resultado, self.referencia_manifesto),
+                            resultado.get("identificador", ""), _resultado_com_erro(resultado))
+
+    def escrever_linha(self, linha: str, identificador: str, com_erro: bool) -> None:
+        """
+        Grava uma linha já serializada por _linha_jsonl (ex.: vinda de um processo trabalhador)
+        """
+        with self._lock:
+            if self._saida is None:
+                dados = linha.encode('utf-8')
+                _anexar(self._descritor, dados)
+                self._posicao += len(dados)
+                self.diario.registrar(identificador, not com_erro, self._posicao)
+                if self.diario.sincronizacao_devida():
+                    os.fsync(self._descritor)
+                    self.diario.sincronizar()
+            else:
+                self._saida.write(linha)
+                self._saida.flush()
+            self.escritos += 1
+
+    def fechar(self) -> None:
+        with self._lock:
+            if self._saida is None:
+                os.fsync(self._descritor)
+                os.close(self._descritor)
+                self.diario.fechar()
+            elif self._saida is not sys.stdout:
+                self._saida.close()
+
+
+def _digitos(valor) -> str:
+    return re.sub(r'[^0-9]', '', str(valor or ''))
+
+
+class ExportadorCSV:
+    """
+    Achata os registros de empresa do lote em tabelas CSV, linha a linha
+
+    Gera empresas.csv (uma linha por empresa e fonte), atividades.csv e
+    socios.csv no diretório indicado, ligadas pela coluna cnpj (só dígitos).
+    Cada resultado é escrito assim que chega, sem acumular o lote em memória;
+    fontes com erro ou sem formato de empresa são ignoradas. Num lote
+    retomado as tabelas são refeitas a partir da saída (reconstruir), pois
+    as falhas repetidas podem trazer empresas que já tinham sido exportadas.
+    """
+
+    TABELAS = {
+        'empresas': ('cnpj', 'fonte', 'identificador', 'razao_social', 'nome_fantasia', 'situacao',
+                     'capital_social', 'logradouro', 'numero', 'bairro', 'municipio', 'uf', 'cep',
+                     'url_fonte', 'consultado_em'),
+        'atividades': ('cnpj', 'fonte', 'tipo', 'ordem', 'codigo', 'descricao'),
+        'socios': ('cnpj', 'fonte', 'ordem', 'nome', 'qualificacao', 'identificador_socio',
+                   'cnpj_cpf_socio', 'nome_rep_legal', 'qual_rep_legal'),
+    }
+    CAMPOS_EMPRESA = frozenset(('cnpj', 'razao_social', 'endereco'))
+
+    def __init__(self, diretorio: str, compressao: Optional[str] = None):
+        self.diretorio = diretorio
+        self.empresas = 0
+        self._lock = threading.Lock()
+        self._arquivos = {}
+        self._escritores = {}
+        os.makedirs(diretorio, exist_ok=True)
+        extensao = {'gzip': '.gz', 'zstd': '.zst'}.get(compressao, '')
+        for tabela, colunas in self.TABELAS.items():
+            caminho = os.path.join(diretorio, f"{tabela}.csv{extensao}")
+            arquivo = _abrir_saida(caminho, compressao)
+            escritor = csv.writer(arquivo, lineterminator='\n')
+            escritor.writerow(colunas)
+            self._arquivos[tabela] = arquivo
+            self._escritores[tabela] = escritor
+
+    @classmethod
+    def _empresa(cls, dados) -> bool:
+        return isinstance(dados, Mapping) and "erro" not in dados and cls.CAMPOS_EMPRESA <= dados.keys()
+
+    def escrever(self, resultado: Dict) -> None:
+        fontes = resultado.get("fontes") or {}
+        linhas = {tabela: [] for tabela in self.TABELAS}
+        for chave, dados in fontes.items():
+            if not self._empresa(dados):
+                continue
+            cnpj = _digitos(dados.get("cnpj"))
+            endereco = dados.get("endereco") or {}
+            linhas['empresas'].append((
+                cnpj, chave, resultado.get("identificador"), dados.get("razao_social"),
+                dados.get("nome_fantasia"), dados.get("situacao"), dados.get("capital_social"),
+                endereco.get("logradouro"), endereco.get("numero"), endereco.get("bairro"),
+                endereco.get("municipio"), endereco.get("uf"), endereco.get("cep"),
+                dados.get("url_fonte"), resultado.get("timestamp")))
+            for tipo, atividades in (('principal', dados.get("atividade_principal")),
+                                     ('secundaria', dados.get("atividades_secundarias"))):
+                for ordem, atividade in enumerate(atividades or [], 1):
+                    if isinstance(atividade, Mapping):
+                        linhas['atividades'].append((cnpj, chave, tipo, ordem, atividade.get("code"),
+                                                     atividade.get("text")))
+            for ordem, socio in enumerate(dados.get("socios") or [], 1):
+                if isinstance(socio, Mapping):
+                    linhas['socios'].append((cnpj, chave, ordem, socio.get("nome"), socio.get("qual"),
+                                             socio.get("identificador_socio"), socio.get("cnpj_cpf_socio"),
+                                             socio.get("nome_rep_legal"), socio.get("qual_rep_legal")))
+        if not linhas['empresas']:
+            return
+        with self._lock:
+            for tabela, registros in linhas.items():
+                self._escritores[tabela].writerows(registros)
+            self.empresas += len(linhas['empresas'])
+
+    def reconstruir(self, diario: DiarioLote) -> None:
+        """
+        Exporta de novo os resultados vigentes da saída de um lote retomado
+        """
+        for resultado in diario.resultados_vigentes():
+            self.escrever(resultado)
+
+    def fechar(self) -> None:
+        with self._lock:
+            for arquivo in self._arquivos.values():
+                arquivo.close()
+
+
+def _entrada_regular(origem: str) -> bool:
+    """
+    Indica se a entrada do lote é um arquivo comum (e não um pipe, terminal ou FIFO)
+    """
+    import stat
+    try:
+        modo = os.fstat(sys.stdin.fileno()).st_mode if origem == '-' else os.stat(origem).st_mode
+    except (OSError, ValueError):
+        return False
+    return stat.S_ISREG(modo)
+
+
+def ler_identificadores(origem: str) -> Iterator[str]:
+    """
+    Lê identificadores sob demanda, um por linha, de um arquivo ou do stdin ('-')
+    """
+    arquivo = sys.stdin if origem == '-' else open(origem, encoding='utf-8')
+    try:
+        for linha in arquivo:
+            identificador = linha.strip()
+            if identificador and not identificador.startswith('#'):
+                yield identificador
+    finally:
+        if arquivo is not sys.stdin:
+            arquivo.close()
+
+
+# Pesos do primeiro e do segundo dígito verificador, por tamanho do documento
+PESOS_DIGITOS_VERIFICADORES = {
+    14: ((5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2), (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)),
+    11: ((10, 9, 8, 7, 6, 5, 4, 3, 2), (11, 10, 9, 8, 7, 6, 5, 4, 3, 2)),
+}
+_PONTUACAO_DOCUMENTO = str.maketrans('', '', './- ')
+
+
+def _digito_verificador(soma: int) -> int:
+    resto = soma % 11
+    return 0 if resto < 2 else 11 - resto
+
+
+def documentos_validos(documentos: List[str], tamanho: int, usar_numpy: Optional[bool] = None) -> List[bool]:
+    """
+    Confere os dígitos verificadores de documentos normalizados (só dígitos, mesmo tamanho)
+
+    Com NumPy (opcional) o bloco inteiro vira uma matriz de dígitos e as
+    somas ponderadas saem de dois produtos matriciais; sem ele, o mesmo
+    cálculo é feito documento a documento. Sequências repetidas
+    (ex.: 00000000000000) são inválidas. Sem usar_numpy explícito, blocos
+    pequenos ficam em Python: a conversão para NumPy não compensaria.
+    """
+    pesos1, pesos2 = PESOS_DIGITOS_VERIFICADORES[tamanho]
+    if not documentos:
+        return []
+    if usar_numpy or (usar_numpy is None and len(documentos) >= 64):
+        try:
+            import numpy
+        except ImportError:
+            if usar_numpy:
+                raise RuntimeError("Validação vetorizada requer o pacote 'numpy' (pip3 install numpy)")
+        else:
+            digitos = numpy.frombuffer(''.join(documentos).encode('ascii'), dtype=numpy.uint8)
+            digitos = digitos.reshape(-1, tamanho).astype(numpy.int32) - 48
+            restos1 = digitos[:, :-2] @ numpy.array(pesos1, dtype=numpy.int32) % 11
+            restos2 = digitos[:, :-1] @ numpy.array(pesos2, dtype=numpy.int32) % 11
+            validos = ((digitos[:, -2] == numpy.where(restos1 < 2, 0, 11 - restos1))
+                       & (digitos[:, -1] == numpy.where(restos2 < 2, 0, 11 - restos2))
+                       & (digitos != digitos[:, :1]).any(axis=1))
+            return validos.tolist()
+
+    resultado = []
+    for documento in documentos:
+        digitos = [ord(c) - 48 for c in documento]
+        resultado.append(
+            digitos[-2] == _digito_verificador(sum(d * p for d, p in zip(digitos, pesos1)))
+            and digitos[-1] == _digito_verificador(sum(d * p for d, p in zip(digitos, pesos2)))
+            and documento.count(documento[0]) != tamanho)
+    return resultado
+
+
+class PreValidacaoLote:
+    """
+    Normaliza, valida e deduplica CNPJs ou CPFs do lote antes de qualquer consulta
+
+    A entrada é processada em blocos de tamanho_bloco linhas: pontuação
+    (./- e espaços) é removida, números puros mais curtos recebem os zeros à
+    esquerda que planilhas costumam perder, e os dígitos verificadores de
+    cada bloco são conferidos de uma vez (documentos_validos). Os inválidos
+    vão para arquivo_rejeitos (CSV entrada,motivo) e os repetidos são
+    descartados; filtrar() devolve os documentos válidos normalizados.
+    """
+
+    TAMANHOS = {'cnpj': 14, 'cpf': 11}
+
+    def __init__(self, tipo: str, arquivo_rejeitos: Optional[str] = None, tamanho_bloco: int = 65536,
+                 usar_numpy: Optional[bool] = None):
+        self.tipo = tipo
+        self.tamanho = self.TAMANHOS[tipo]
+        self.tamanho_bloco = max(1, tamanho_bloco)
+        self.usar_numpy = usar_numpy
+        self.arquivo_rejeitos = arquivo_rejeitos
+        self.lidos = 0
+        self.validos = 0
+        self.duplicados = 0
+        self.rejeitados = 0
+        self._vistos = set()
+        self._rejeitos = None
+        self._escritor_rejeitos = None
+        if arquivo_rejeitos is not None:
+            self._rejeitos = _abrir_saida(arquivo_rejeitos)
+            self._escritor_rejeitos = csv.writer(self._rejeitos, lineterminator='\n')
+            self._escritor_rejeitos.writerow(('entrada', 'motivo'))
+
+    def _rejeitar(self, entrada: str, motivo: str) -> None:
+        self.rejeitados += 1
+        if self._escritor_rejeitos is not None:
+            self._escritor_rejeitos.writerow((entrada, motivo))
+
+    def _bloco(self, linhas: List[str]) -> List[str]:
+        tamanho = self.tamanho
+        # Bloco ASCII: a pontuação sai de uma vez com bytes.translate
+        texto = '\n'.join(linhas)
+        if texto.isascii() and texto.count('\n') == len(linhas) - 1:
+            documentos = texto.encode('ascii').translate(None, b'./- ').decode('ascii').split('\n')
+        else:
+            documentos = [linha.translate(_PONTUACAO_DOCUMENTO) for linha in linhas]
+
+        candidatos, entradas = [], []
+        for linha, documento in zip(linhas, documentos):
+            if len(documento) == tamanho and documento.isdigit() and documento.isascii():
+                candidatos.append(documento)
+                entradas.append(linha)
+            elif not documento.isdigit() or not documento.isascii():
+                self._rejeitar(linha, "caracteres inválidos")
+            elif len(documento) > tamanho or documento != linha:
+                self._rejeitar(linha, f"{self.tipo.upper()} deve ter {tamanho} dígitos")
+            else:
+                candidatos.append(documento.zfill(tamanho))
+                entradas.append(linha)
+
+        aceitos = []
+        vistos = self._vistos
+        for documento, entrada, valido in zip(candidatos, entradas,
+                                              documentos_validos(candidatos, tamanho, self.usar_numpy)):
+            if not valido:
+                self._rejeitar(entrada, "dígito verificador inválido")
+                continue
+            # Inteiros ocupam menos que as strings no conjunto de vistos
+            chave = int(documento)
+            if chave in vistos:
+                self.duplicados += 1
+                continue
+            vistos.add(chave)
+            aceitos.append(documento)
+        self.validos += len(aceitos)
+        return aceitos
+
+    def filtrar(self, identificadores: Iterable[str]) -> Iterator[str]:
+        bloco = []
+        for identificador in identificadores:
+            self.lidos += 1
+            bloco.append(identificador)
+            if len(bloco) >= self.tamanho_bloco:
+                yield from self._bloco(bloco)
+                bloco = []
+        if bloco:
+            yield from self._bloco(bloco)
+
+    def fechar(self) -> None:
+        if self._rejeitos is not None:
+            self._rejeitos.close()
+
+
+# Estado de cada processo trabalhador do lote (--workers), montado pelo initializer do pool
+_TRABALHADOR_LOTE: Dict = {}
+
+
+def _iniciar_trabalhador_lote(configuracao: Dict) -> None:
+    """
+    Monta o consultor do processo: sessão e conexão ao cache próprias, cota compartilhada
+    """
+    import signal
+    from concurrent.futures import ThreadPoolExecutor
+    from multiprocessing.util import Finalize
+    # Ctrl-C é tratado pelo processo principal, que encerra o pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    cache = None
+    if configuracao["cache"] is not None:
+        cache = CacheRespostas(**configuracao["cache"])
+    limitador = None
+    if configuracao["cotas"] is not None:
+        limitador = LimitadorTaxa(configuracao["cotas"], compartilhado=configuracao["estado_cotas"])
+    base_offline = BaseCNPJOffline(configuracao["base_offline"]) if configuracao["base_offline"] else None
+    consultor = MrHolmesCorp(cache=cache, limitador=limitador, base_offline=base_offline, silencioso=True,
+                             politica=PoliticaRetentativa(tentativas=configuracao["tentativas"]),
+                             **configuracao["consultor"])
+    if limitador is not None and configuracao["rede"]:
+        consultor.escalonador = EscalonadorHosts(limitador, trabalhadores=configuracao["concorrencia"] * 2)
+    # Threads criadas uma vez por processo; cada trecho só distribui seus itens entre elas
+    executor = ThreadPoolExecutor(max_workers=configuracao["concorrencia"], thread_name_prefix='mrholmescorp-lote')
+    opcoes_busca = dict(configuracao["opcoes_busca"])
+    opcoes_busca.setdefault("incluir_catalogos", not configuracao["compacto"])
+    _TRABALHADOR_LOTE.update(configuracao=configuracao, consultor=consultor, executor=executor,
+                             opcoes_busca=opcoes_busca)
+    Finalize(consultor, _encerrar_trabalhador_lote, args=(consultor, executor), exitpriority=10)
+
+
+def _encerrar_trabalhador_lote(consultor: MrHolmesCorp, executor) -> None:
+    executor.shutdown()
+    if consultor.escalonador is not None:
+        consultor.escalonador.encerrar()
+    if consultor.cache is not None:
+        consultor.cache.fechar()
+    if consultor.base_offline is not None:
+        consultor.base_offline.fechar()
+
+
+def _processar_trecho_lote(trecho: List[str]) -> List[Tuple[str, bool, str]]:
+    """
+    Consulta um trecho no processo trabalhador e devolve (identificador, com_erro, linha JSONL)
+    """
+    configuracao = _TRABALHADOR_LOTE["configuracao"]
+    consultor = _TRABALHADOR_LOTE["consultor"]
+    opcoes_busca = _TRABALHADOR_LOTE["opcoes_busca"]
+
+    def processar(identificador: str) -> Tuple[str, bool, str]:
+        resultado, com_erro = consultor._buscar_item_lote(identificador, configuracao["tipo"], opcoes_busca)
+        return identificador, com_erro, _linha_jsonl(resultado, configuracao["referencia_manifesto"])
+
+    return list(_TRABALHADOR_LOTE["executor"].map(processar, trecho))
+
+
+def processar_lote_multiprocesso(configuracao: Dict, identificadores: Iterable[str],
+                                 escritor: EscritorRelatorios, processos: int, ordenado: bool = False,
+                                 tamanho_trecho: int = 64, concluidos: Optional[Iterable[str]] = None,
+                                 exportadores: Iterable = ()) -> Dict[str, int]:
+    """
+    Distribui o lote em trechos entre processos e junta os resultados em uma única saída
+
+    Cada processo monta seu próprio MrHolmesCorp a partir de configuracao
+    (ver _iniciar_trabalhador_lote) e serializa os resultados; o processo
+    principal só grava as linhas, trecho a trecho, na ordem da entrada
+    (ordenado=True, via imap) ou de conclusão dos trechos (imap_unordered). No máximo 4 trechos por processo
+    ficam em voo, então a memória continua independente do tamanho da
+    entrada. Os exportadores recebem os resultados desserializados. As
+    cotas de configuracao valem para o conjunto: os processos dividem os
+    mesmos baldes em memória compartilhada (LimitadorTaxa.compartilhar).
+    """
+    import multiprocessing
+
+    concluidos = concluidos or ()
+    exportadores = tuple(exportadores)
+    estado_cotas = None
+    if configuracao["cotas"] is not None:
+        estado_cotas = LimitadorTaxa(configuracao["cotas"]).compartilhar()
+    configuracao = dict(configuracao, compacto=escritor.compacto, referencia_manifesto=escritor.referencia_manifesto,
+                        estado_cotas=estado_cotas)
+    contadores = {"processados": 0, "com_erro": 0, "pulados": 0}
+    vagas = threading.Semaphore(processos * 4)
+    parar = threading.Event()
+
+    def trechos() -> Iterator[List[str]]:
+        # Roda na thread do pool que distribui as tarefas; vagas limita os trechos em voo
+        trecho = []
+        for identificador in identificadores:
+            if identificador in concluidos:
+                contadores["pulados"] += 1
+                continue
+            trecho.append(identificador)
+            if len(trecho) >= tamanho_trecho:
+                vagas.acquire()
+                if parar.is_set():
+                    return
+                yield trecho
+                trecho = []
+        if trecho:
+            vagas.acquire()
+            if not parar.is_set():
+                yield trecho
+
+    pool = multiprocessing.Pool(processos, initializer=_iniciar_trabalhador_lote, initargs=(configuracao,))
+    try:
+        mapear = pool.imap if ordenado else pool.imap_unordered
+        for linhas in mapear(_processar_trecho_lote, trechos()):
+            vagas.release()
+            for identificador, com_erro, linha in linhas:
+                if exportadores:
+                    resultado = json.loads(linha)
+                    for exportador in exportadores:
+                        exportador.escrever(resultado)
+                escritor.escrever_linha(linha, identificador, com_erro)
+                contadores["processados"] += 1
+                contadores["com_erro"] += com_erro
+        pool.close()
+    except BaseException:
+        parar.set()
+        vagas.release(processos * 4)
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+    return contadores
+
+
+def selecao_base_offline(tipo: str) -> List[str]:
+    """
+    Fontes padrão do tipo com a base CNPJ offline no lugar da ReceitaWS
+    """
+    fontes = [fonte.chave for fonte in planejar_fontes(tipo) if fonte.chave != 'receitaws']
+    if tipo == 'cnpj':
+        fontes.append('cnpj_offline')
+    return fontes
+
+
+class ExpansaoSocietaria:
+    """
+    Percorre o grafo de participações a partir de CNPJs semente
+
+    Sócios pessoa jurídica (identificador_socio "1", documento com 14
+    dígitos) viram novos nós até profundidade_maxima; cada empresa é
+    consultada no máximo uma vez por expansão (conjunto de visitados), então
+    subárvores compartilhadas entre sementes não se repetem. A fronteira é um
+    heap por profundidade, o que gasta o orçamento limite_empresas nos nós
+    mais próximos das sementes. As consultas usam a base offline quando
+    configurada, senão a ReceitaWS com cache; a ReceitaWS não informa o
+    documento dos sócios, então sem base offline a expansão para nas sementes.
+    """
+
+    TIPOS_SOCIO = {'1': 'PJ', '2': 'PF', '3': 'estrangeiro'}
+
+    def __init__(self, consultor: MrHolmesCorp, profundidade_maxima: int = 3, limite_empresas: int = 500,
+                 concorrencia: int = 4):
+        self.consultor = consultor
+        self.profundidade_maxima = max(0, profundidade_maxima)
+        self.limite_empresas = max(1, limite_empresas)
+        self.concorrencia = max(1, concorrencia)
+        self.consultadas = 0
+        self.com_erro = 0
+        self.arestas_emitidas = 0
+        self.nao_expandidas = 0
+        self._consultar = (consultor.consultar_cnpj_offline if consultor.base_offline is not None
+                           else consultor.consultar_cnpj_receitaws)
+
+    def arestas(self, sementes: Iterable[str]) -> Iterator[Dict]:
+        """
+        Gera as arestas sócio -> empresa à medida que as empresas são consultadas
+        """
+        from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+        fronteira = []
+        visitados = set()
+        sequencia = 0
+        for semente in sementes:
+            cnpj = _digitos(semente)
+            if len(cnpj) == 14 and cnpj not in visitados:
+                visitados.add(cnpj)
+                heapq.heappush(fronteira, (0, sequencia, cnpj))
+                sequencia += 1
+
+        pendentes = {}
+        with ThreadPoolExecutor(max_workers=self.concorrencia, thread_name_prefix='mrholmescorp-grafo') as executor:
+            while fronteira or pendentes:
+                while fronteira and len(pendentes) < self.concorrencia and self.consultadas < self.limite_empresas:
+                    profundidade, _, cnpj = heapq.heappop(fronteira)
+                    pendentes[executor.submit(self._consultar, cnpj)] = (profundidade, cnpj)
+                    self.consultadas += 1
+                if not pendentes:
+                    break
+                prontos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    profundidade, cnpj = pendentes.pop(futuro)
+                    try:
+                        empresa = futuro.result()
+                    except Exception:
+                        empresa = None
+                    if not isinstance(empresa, Mapping) or "erro" in empresa:
+                        self.com_erro += 1
+                        continue
+                    for socio in empresa.get("socios") or []:
+                        if not isinstance(socio, Mapping):
+                            continue
+                        documento = _digitos(socio.get("cnpj_cpf_socio"))
+                        tipo = self.TIPOS_SOCIO.get(str(socio.get("identificador_socio") or ''))
+                        self.arestas_emitidas += 1
+                        # Fora PJ, o documento vem mascarado (***123456**) e é mantido como veio
+                        yield {"origem": documento if tipo == 'PJ' else socio.get("cnpj_cpf_socio") or '',
+                               "origem_nome": socio.get("nome"), "origem_tipo": tipo,
+                               "destino": cnpj, "destino_nome": empresa.get("razao_social"),
+                               "qualificacao": socio.get("qual"), "profundidade": profundidade}
+                        if (tipo == 'PJ' and len(documento) == 14 and documento not in visitados
+                                and profundidade < self.profundidade_maxima):
+                            visitados.add(documento)
+                            heapq.heappush(fronteira, (profundidade + 1, sequencia, documento))
+                            sequencia += 1
+        self.nao_expandidas = len(fronteira)
+
+
+class ServidorConsultas:
+    """
+    API HTTP/JSON local sobre um único MrHolmesCorp aquecido (modo --serve)
+
+    POST /consultar recebe {"identificador", "tipo", "fontes", ...} e devolve
+    o resultado de buscar_completa; GET /saude, /catalogos e /metrics
+    completam a API. Escuta em host:porta ou em um socket Unix. No máximo
+    `concorrencia` consultas rodam ao mesmo tempo e outras `tamanho_fila`
+    aguardam; acima disso a resposta é 503 com Retry-After. encerrar() para
+    de aceitar conexões e espera as consultas em andamento terminarem.
+    """
+
+    OPCOES_PEDIDO = ('paralelo', 'timeout_fonte', 'timeout_total', 'incluir_catalogos')
+
+    def __init__(self, consultor: MrHolmesCorp, host: str = '127.0.0.1', porta: int = 8765,
+                 socket_unix: Optional[str] = None, concorrencia: int = 8,
+                 tamanho_fila: Optional[int] = None, tipo_padrao: Optional[str] = None,
+                 fontes_padrao: Optional[List[str]] = None, **opcoes_busca):
+        self.consultor = consultor
+        self.host = host
+        self.porta = porta
+        self.socket_unix = socket_unix
+        self.concorrencia = max(1, concorrencia)
+        self.tamanho_fila = self.concorrencia * 4 if tamanho_fila is None else max(0, tamanho_fila)
+        self.tipo_padrao = tipo_padrao
+        self.fontes_padrao = fontes_padrao
+        self.opcoes_busca = opcoes_busca
+        self.atendidas = 0
+        self.recusadas = 0
+        self._vagas = threading.BoundedSemaphore(self.concorrencia + self.tamanho_fila)
+        self._execucao = threading.BoundedSemaphore(self.concorrencia)
+        self._condicao = threading.Condition()
+        self._em_andamento = 0
+        self._encerrando = False
+        self._servidor = None
+        self._thread = None
+
+    @property
+    def endereco(self) -> str:
+        if self.socket_unix:
+            return f"unix:{self.socket_unix}"
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def saude(self) -> Dict:
+        with self._condicao:
+            em_andamento = self._em_andamento
+        return {
+            "status": "encerrando" if self._encerrando else "ok",
+            "em_andamento": em_andamento,
+            "concorrencia": self.concorrencia,
+            "tamanho_fila": self.tamanho_fila,
+            "atendidas": self.atendidas,
+            "recusadas": self.recusadas
+        }
+
+    @staticmethod
+    def _validar_opcoes(pedido: Dict) -> None:
+        """
+        Confere os tipos dos campos opcionais do pedido; ValueError vira HTTP 400
+        """
+        def numero(valor) -> bool:
+            return valor is None or (isinstance(valor, (int, float)) and not isinstance(valor, bool) and valor > 0)
+
+        for chave in ('paralelo', 'incluir_catalogos'):
+            if chave in pedido and not isinstance(pedido[chave], bool):
+                raise ValueError(f"{chave} deve ser true ou false")
+        if 'timeout_total' in pedido and not numero(pedido['timeout_total']):
+            raise ValueError("timeout_total deve ser um número positivo (segundos)")
+        if 'timeout_fonte' in pedido:
+            timeout_fonte = pedido['timeout_fonte']
+            valores = timeout_fonte.values() if isinstance(timeout_fonte, dict) else [timeout_fonte]
+            if not all(numero(valor) for valor in valores):
+                raise ValueError("timeout_fonte deve ser um número positivo ou um objeto fonte -> segundos")
+        fontes = pedido.get('fontes')
+        if fontes is not None and not isinstance(fontes, str) and not (
+                isinstance(fontes, list) and all(isinstance(chave, str) for chave in fontes)):
+            raise ValueError("fontes deve ser uma lista de chaves ou um texto separado por vírgulas")
+
+    def _fontes(self, tipo: str, pedido: Dict) -> Optional[List[str]]:
+        fontes = pedido.get('fontes', self.fontes_padrao)
+        if isinstance(fontes, str):
+            fontes = fontes.split(',')
+        if fontes is None and self.consultor.base_offline is not None:
+            fontes = selecao_base_offline(tipo)
+        return fontes
+
+    def atender(self, corpo: bytes) -> Tuple[int, Dict, Optional[Dict[str, str]]]:
+        """
+        Valida e executa um pedido de consulta; retorna (status HTTP, resposta, cabeçalhos)
+        """
+        if self._encerrando:
+            return 503, {"erro": "Servidor encerrando"}, {'Retry-After': '1', 'Connection': 'close'}
+        try:
+            pedido = json.loads(corpo or b'{}')
+            if not isinstance(pedido, dict):
+                raise ValueError("o corpo deve ser um objeto JSON")
+        except ValueError as e:
+            return 400, {"erro": f"Pedido inválido: {str(e)}"}, None
+
+        identificador = pedido.get('identificador')
+        tipo = pedido.get('tipo') or self.tipo_padrao
+        if not identificador:
+            return 400, {"erro": "Campo obrigatório: identificador"}, None
+        if not isinstance(identificador, str):
+            return 400, {"erro": "identificador deve ser um texto"}, None
+        if tipo not in TIPOS_CONSULTA:
+            return 400, {"erro": f"Tipo inválido: {tipo} (use {', '.join(TIPOS_CONSULTA)})"}, None
+        try:
+            self._validar_opcoes(pedido)
+        except ValueError as e:
+            return 400, {"erro": f"Pedido inválido: {str(e)}"}, None
+        fontes = self._fontes(tipo, pedido)
+        try:
+            planejar_fontes(tipo, fontes)
+        except ValueError as e:
+            return 400, {"erro": str(e)}, None
+        opcoes = dict(self.opcoes_busca, incluir_catalogos=False)
+        opcoes.update((chave, pedido[chave]) for chave in self.OPCOES_PEDIDO if chave in pedido)
+
+        # Vagas = execução + fila; sem vaga o cliente recebe 503 na hora (backpressure)
+        if not self._vagas.acquire(blocking=False):
+            with self._condicao:
+                self.recusadas += 1
+            return 503, {"erro": "Servidor ocupado, tente novamente"}, {'Retry-After': '1'}
+        try:
+            with self._execucao:
+                resultado = self.consultor.buscar_completa(str(identificador), tipo, fontes=fontes, **opcoes)
+        except Exception as e:
+            return 500, {"erro": f"Erro durante a consulta: {str(e)}"}, None
+        finally:
+            self._vagas.release()
+        with self._condicao:
+            self.atendidas += 1
+        return 200, resultado, None
+
+    def _entrar(self) -> None:
+        with self._condicao:
+            self._em_andamento += 1
+
+    def _sair(self) -> None:
+        with self._condicao:
+            self._em_andamento -= 1
+            self._condicao.notify_all()
+
+    @staticmethod
+    def _remover_socket_orfao(caminho: str) -> None:
+        """
+        Remove o socket de uma execução anterior que morreu; recusa arquivos comuns e sockets em uso
+        """
+        import socket
+        import stat
+        try:
+            modo = os.lstat(caminho).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(modo):
+            raise OSError(f"{caminho} já existe e não é um socket")
+        sonda = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sonda.connect(caminho)
+        except ConnectionRefusedError:
+            # Ninguém escuta: socket órfão
+            os.remove(caminho)
+            return
+        finally:
+            sonda.close()
+        raise OSError(f"{caminho} já está em uso por outro servidor")
+
+    def _criar_servidor(self):
+        import socketserver
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        api = self
+        metricas = self.consultor.metricas
+
+        class Manipulador(BaseHTTPRequestHandler):
+            # Keep-alive: clientes reaproveitam a conexão entre consultas
+            protocol_version = 'HTTP/1.1'
+            # Cabeçalhos e corpo saem em um único envio (evita Nagle + ACK atrasado)
+            wbufsize = 1 << 16
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def _responder(self, status: int, corpo: bytes, tipo: str = 'application/json; charset=utf-8',
+                           cabecalhos: Optional[Dict[str, str]] = None) -> None:
+                metricas.incrementar('mrholmescorp_api_respostas_total', status=status)
+                self.send_response(status)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(corpo)))
+                for nome, valor in (cabecalhos or {}).items():
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(corpo)
+                if api._encerrando:
+                    self.close_connection = True
+
+            def _json(self, status: int, dados: Dict, cabecalhos: Optional[Dict[str, str]] = None) -> None:
+                self._responder(status, json.dumps(dados, ensure_ascii=False, default=_serializar_json).encode('utf-8'),
+                                cabecalhos=cabecalhos)
+
+            def do_GET(self) -> None:
+                caminho = self.path.split('?')[0]
+                if caminho == '/saude':
+                    self._json(200, api.saude())
+                elif caminho == '/catalogos':
+                    self._json(200, api.consultor.catalogos_estaticos())
+                elif caminho == '/metrics':
+                    self._responder(200, metricas.exportar_prometheus().encode('utf-8'),
+                                    'text/plain; version=0.0.4; charset=utf-8')
+                else:
+                    self._json(404, {"erro": "Caminho não encontrado"})
+
+            def do_POST(self) -> None:
+                corpo = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                if self.path.split('?')[0] != '/consultar':
+                    self._json(404, {"erro": "Caminho não encontrado"})
+                    return
+                api._entrar()
+                try:
+                    self._json(*api.atender(corpo))
+                finally:
+                    api._sair()
+
+        if self.socket_unix:
+            class Servidor(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+                daemon_threads = True
+
+            self._remover_socket_orfao(self.socket_unix)
+            return Servidor(self.socket_unix, Manipulador)
+
+        servidor = ThreadingHTTPServer((self.host, self.porta), Manipulador)
+        servidor.daemon_threads = True
+        return servidor
+
+    def iniciar(self) -> None:
+        """
+        Começa a aceitar conexões em uma thread de fundo
+        """
+        self._servidor = self._criar_servidor()
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name='mrholmescorp-api',
+                                        daemon=True)
+        self._thread.start()
+
+    def encerrar(self, espera: Optional[float] = 30) -> bool:
+        """
+        Para de aceitar conexões e aguarda as consultas em andamento; False se o prazo estourou
+        """
+        self._encerrando = True
+        if self._servidor is not None:
+            self._servidor.shutdown()
+        with self._condicao:
+            concluido = self._condicao.wait_for(lambda: self._em_andamento == 0, timeout=espera)
+        if self._servidor is not None:
+            self._servidor.server_close()
+            if self.socket_unix and os.path.exists(self.socket_unix):
+                os.remove(self.socket_unix)
+        return concluido
+
+
+def _finalizar_metricas_perfil(consultor: MrHolmesCorp, args, arquivo_saida: Optional[str] = None,
+                               console: TextIO = sys.stdout) -> None:
+    """
+    Grava as métricas (--metrics) e, no lote e no grafo societário, o perfil (--profile) ao lado da saída
+    """
+    if args.metrics:
+        consultor.metricas.gravar(args.metrics)
+        print(f"[INFO] Métricas salvas em: {args.metrics}", file=console)
+    if consultor.perfilador is not None and arquivo_saida is not None:
+        relatorio = consultor.perfilador.relatorio()
+        if arquivo_saida == '-':
+            print(relatorio, file=console)
+        else:
+            arquivo_perfil = re.sub(r'(\.jsonl?|\.csv)?(\.gz|\.zst)?$', '', arquivo_saida) + '.perfil.txt'
+            with open(arquivo_perfil, 'w', encoding='utf-8') as f:
+                f.write(relatorio)
+            print(f"[INFO] Perfil salvo em: {arquivo_perfil}", file=console)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mr.HolmesCorp - Consultor de Informações em Fontes Públicas v2.0')
+    parser.add_argument('identificador', nargs='?', help='CNPJ, CPF, Nome, RG ou Placa para consulta')
+    parser.add_argument('--tipo', choices=TIPOS_CONSULTA,
+                        help='Tipo de consulta (cnpj, cpf, nome, rg, placa); com --serve, o padrão dos pedidos')
+    parser.add_argument('--output', '-o', help='Arquivo de saída para o relatório (no modo lote, JSONL; "-" para stdout)')
+    parser.add_argument('--verbose', '-v', action='store_true', help='Modo verboso')
+    parser.add_argument('--listar-fontes', action='store_true', help='Listar todas as fontes disponíveis')
+    parser.add_argument('--paralelo', action='store_true',
+                        help='Consultar todas as fontes ao mesmo tempo (latência da fonte mais lenta)')
+    parser.add_argument('--timeout-fonte', type=float, metavar='SEG',
+                        help='Prazo máximo de cada fonte no modo paralelo')
+    parser.add_argument('--timeout-total', type=float, metavar='SEG',
+                        help='Prazo máximo da busca completa no modo paralelo')
+    parser.add_argument('--fontes', metavar='LISTA',
+                        help='Fontes a consultar, separadas por vírgula; prefixo "^" exclui '
+                             '(ex.: receitaws,bcb_valores ou ^bcb_valores)')
+    parser.add_argument('--base-offline', metavar='DIRETORIO',
+                        help='Base CNPJ offline; substitui a ReceitaWS pela fonte cnpj_offline')
+    parser.add_argument('--importar-cnpj', metavar='DIRETORIO_CSV',
+                        help='Importar o dump de CNPJ da Receita Federal (CSV ou .zip) para --base-offline')
+    parser.add_argument('--formato', choices=['json', 'jsonl'],
+                        help='Formato do relatório: json (completo, indentado) ou jsonl (compacto, '
+                             'catálogos em manifesto à parte). Padrão: json; no modo lote, jsonl')
+    parser.add_argument('--compressao', choices=['gzip', 'zstd'],
+                        help='Comprimir a saída (também deduzido das extensões .gz/.zst)')
+    parser.add_argument('--batch', metavar='ARQUIVO',
+                        help='Consultar em lote os identificadores do arquivo, um por linha ("-" para stdin)')
+    parser.add_argument('--grafo-socios', action='store_true',
+                        help='Expandir a rede societária a partir dos CNPJs informados e gravar as arestas '
+                             'sócio -> empresa em CSV')
+    parser.add_argument('--profundidade', type=int, default=3, metavar='N',
+                        help='Níveis de sócios pessoa jurídica seguidos em --grafo-socios (padrão: 3)')
+    parser.add_argument('--limite-empresas', type=int, default=500, metavar='N',
+                        help='Máximo de empresas consultadas em --grafo-socios (padrão: 500)')
+    parser.add_argument('--csv-dir', metavar='DIRETORIO',
+                        help='Exportar também as empresas em CSV (empresas, atividades e socios) nesse diretório')
+    parser.add_argument('--rejeitos', metavar='ARQUIVO',
+                        help='CSV com os CNPJs/CPFs inválidos do lote (padrão: <saida>.rejeitos.csv)')
+    parser.add_argument('--sem-validacao', action='store_true',
+                        help='Não validar nem deduplicar os CNPJs/CPFs do lote antes das consultas')
+    parser.add_argument('--resume', action='store_true',
+                        help='Retomar o lote em --output pelo diário de checkpoint: pula os concluídos '
+                             'e repete as falhas')
+    parser.add_argument('--concorrencia', type=int, default=4, metavar='N',
+                        help='Consultas simultâneas no modo lote ou --serve (padrão: 4)')
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help='Processos do modo lote, cada um com --concorrencia consultas, sessão, '
+                             'conexão ao cache e 1/N da cota (padrão: 1)')
+    parser.add_argument('--ordenado', action='store_true',
+                        help='Com --workers, gravar os resultados na ordem da entrada')
+    parser.add_argument('--serve', action='store_true',
+                        help='Manter o consultor aquecido atrás de uma API HTTP/JSON local (POST /consultar)')
+    parser.add_argument('--porta', type=int, default=8765, metavar='PORTA',
+                        help='Porta da API em 127.0.0.1 no modo --serve (padrão: 8765)')
+    parser.add_argument('--socket', metavar='ARQUIVO',
+                        help='Atender a API em um socket Unix em vez de TCP (modo --serve)')
+    parser.add_argument('--fila', type=int, metavar='N',
+                        help='Pedidos aguardando vaga no modo --serve antes de responder 503 '
+                             '(padrão: 4x --concorrencia)')
+    parser.add_argument('--cota', action='append', default=[], metavar='HOST=N/SEG',
+                        help='Cota de requisições por host, ex.: www.receitaws.com.br=3/60 (pode repetir)')
+    parser.add_argument('--sem-limite', action='store_true',
+                        help='Desativar o limitador de taxa por host')
+    parser.add_argument('--timeout-conexao', type=float, metavar='SEG',
+                        help='Tempo máximo para conectar a uma fonte de rede (padrão: 10)')
+    parser.add_argument('--timeout-leitura', type=float, default=30, metavar='SEG',
+                        help='Tempo máximo de leitura da resposta de uma fonte de rede (padrão: 30)')
+    parser.add_argument('--tentativas', type=int, default=3, metavar='N',
+                        help='Tentativas por requisição em falhas transitórias, com backoff (padrão: 3)')
+    parser.add_argument('--metrics', metavar='ARQUIVO',
+                        help='Gravar as métricas por fonte ao final (texto Prometheus; JSON se terminar em .json)')
+    parser.add_argument('--metrics-porta', type=int, metavar='PORTA',
+                        help='Expor GET /metrics (Prometheus) em 127.0.0.1:PORTA durante o modo lote')
+    parser.add_argument('--profile', action='store_true',
+                        help='Anexar o perfil cProfile da execução ao relatório')
+    parser.add_argument('--no-cache', action='store_true', help='Não usar o cache persistente de respostas')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Ignorar respostas em cache e renovar com consultas novas')
+    parser.add_argument('--cache-arquivo', metavar='ARQUIVO',
+                        help='Arquivo SQLite do cache (padrão: ~/.cache/mr_holmescorp/cache.sqlite3)')
+    parser.add_argument('--cache-ttl', action='append', default=[], metavar='FONTE=SEG',
+                        help='TTL do cache por fonte, ex.: receitaws=86400 (pode repetir)')
+    parser.add_argument('--cache-max', type=int, default=100000, metavar='N',
+                        help='Número máximo de entradas no cache (LRU)')
+
+    args = parser.parse_args()
+
+    if args.grafo_socios:
+        if args.tipo not in (None, 'cnpj'):
+            parser.error("--grafo-socios só se aplica a CNPJs")
+        args.tipo = 'cnpj'
+    if args.tipo is None and not args.serve:
+        parser.error("o argumento --tipo é obrigatório")
+
+    if args.importar_cnpj:
+        if not args.base_offline:
+            parser.error("--importar-cnpj requer --base-offline DIRETORIO")
+        print(f"[INFO] Importando dump de CNPJ de {args.importar_cnpj} para {args.base_offline}...")
+        try:
+            totais = importar_base_cnpj(args.importar_cnpj, args.base_offline,
+                                        progresso=lambda tabela, n: print(f"[INFO] {tabela}: {n} registros..."))
+        except (OSError, ValueError) as e:
+            print(f"[ERRO] Falha na importação: {str(e)}")
+            sys.exit(1)
+        for tabela, total in totais.items():
+            print(f"- {tabela}: {total} registros")
+        print("[CONCLUÍDO] Base offline gerada com sucesso!")
+        return
+
+    if not args.identificador and not args.batch and not args.listar_fontes and not args.serve:
+        parser.error("informe o identificador ou use --batch ARQUIVO")
+    # O diário só acompanha saídas em arquivo sem compressão
+    lote_com_diario = bool(args.batch) and args.output != '-' and args.compressao is None and \
+        not (args.output or '').endswith(('.gz', '.zst'))
+    if args.resume and not (args.output and lote_com_diario):
+        parser.error("--resume requer --batch e --output ARQUIVO sem compressão")
+    if args.workers > 1 and (not args.batch or args.serve or args.grafo_socios):
+        parser.error("--workers só se aplica ao modo --batch")
+    if args.workers > 1 and (args.metrics or args.metrics_porta or args.profile):
+        parser.error("--metrics, --metrics-porta e --profile não combinam com --workers "
+                     "(cada processo teria as suas)")
+
+    fontes = args.fontes.split(',') if args.fontes else None
+    if args.base_offline and fontes is None and args.tipo:
+        # Com base offline, a fonte local substitui a ReceitaWS
+        fontes = selecao_base_offline(args.tipo)
+    plano = []
+    try:
+        if args.tipo:
+            plano = planejar_fontes(args.tipo, fontes)
+        elif fontes is not None:
+            planejar_fontes(TIPOS_CONSULTA[0], fontes)
+    except ValueError as e:
+        parser.error(str(e))
+    # Cache e limitador só servem às fontes de rede: consultas apenas a fontes
+    # estáticas e --listar-fontes não abrem o SQLite nem montam a pilha HTTP
+    usa_rede = args.serve or (not args.listar_fontes and any(fonte.rede for fonte in plano))
+
+    cache = None
+    if usa_rede and not args.no_cache:
+        import sqlite3
+        ttl = {}
+        for item in args.cache_ttl:
+            fonte, _, segundos = item.partition('=')
+            try:
+                ttl[fonte.strip()] = float(segundos)
+            except ValueError:
+                parser.error(f"--cache-ttl inválido: {item} (use FONTE=SEGUNDOS)")
+        try:
+            cache = CacheRespostas(args.cache_arquivo, ttl=ttl, max_entradas=args.cache_max)
+        except (OSError, sqlite3.Error) as e:
+            print(f"[AVISO] Cache desativado: {str(e)}")
+
+    limitador = None
+    if usa_rede and not args.sem_limite:
+        cotas = {}
+        for item in args.cota:
+            host, _, cota = item.partition('=')
+            requisicoes, _, periodo = cota.partition('/')
+            try:
+                cotas[host.strip()] = (float(requisicoes), float(periodo or 1))
+            except ValueError:
+                parser.error(f"--cota inválida: {item} (use HOST=REQUISICOES/SEGUNDOS)")
+        limitador = LimitadorTaxa(cotas)
+
+    base_offline = None
+    if args.base_offline:
+        try:
+            base_offline = BaseCNPJOffline(args.base_offline)
+        except OSError as e:
+            parser.error(f"base offline inválida em {args.base_offline}: {str(e)}")
+
+    consultor = MrHolmesCorp(timeout=args.timeout_leitura, timeout_conexao=args.timeout_conexao,
+                             cache=cache, atualizar_cache=args.refresh,
+                             silencioso=bool(args.batch or args.serve or args.grafo_socios),
+                             limitador=limitador, base_offline=base_offline,
+                             politica=PoliticaRetentativa(tentativas=args.tentativas))
+    if args.profile:
+        consultor.perfilador = PerfiladorThreads()
+
+    # Com o lote gravado no stdout, as mensagens vão para o stderr
+    console = sys.stderr if (args.batch or args.grafo_socios) and args.output == '-' else sys.stdout
+
+    print("=" * 80, file=console)
+    print("MR.HOLMESCORP - CONSULTOR DE INFORMAÇÕES PÚBLICAS v2.0", file=console)
+    print("Integração com múltiplas fontes governamentais", file=console)
+    print("=" * 80, file=console)
+
+    if args.listar_fontes:
+        print("\n[FONTES DISPONÍVEIS]")
+        for nome, url in consultor.urls.items():
+            print(f"- {nome}: {url}")
+        print("\n[FONTES DE CONSULTA]")
+        for fonte in REGISTRO_FONTES.values():
+            detalhes = "rede" if fonte.rede else "estática"
+            print(f"- {fonte.chave}: {', '.join(fonte.tipos)} ({detalhes}, custo {fonte.custo})")
+        return
+
+    if args.serve:
+        import signal
+        # Sem --tipo, --fontes só vale para pedidos que não informam as próprias
+        servidor = ServidorConsultas(consultor, porta=args.porta, socket_unix=args.socket,
+                                     concorrencia=args.concorrencia, tamanho_fila=args.fila,
+                                     tipo_padrao=args.tipo,
+                                     fontes_padrao=args.fontes.split(',') if args.fontes else None,
+                                     paralelo=args.paralelo, timeout_fonte=args.timeout_fonte,
+                                     timeout_total=args.timeout_total)
+        if limitador is not None:
+            consultor.escalonador = EscalonadorHosts(limitador, trabalhadores=args.concorrencia * 2)
+        parar = threading.Event()
+        for sinal in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sinal, lambda *_: parar.set())
+        try:
+            try:
+                servidor.iniciar()
+            except OSError as e:
+                print(f"[ERRO] Não foi possível abrir a API: {str(e)}")
+                sys.exit(1)
+            print(f"[INFO] API em {servidor.endereco} (POST /consultar, GET /saude, /catalogos, /metrics)")
+            print(f"[INFO] Até {servidor.concorrencia} consultas simultâneas e {servidor.tamanho_fila} na fila")
+            while not parar.wait(1):
+                pass
+            print("\n[INFO] Encerrando: aguardando consultas em andamento...")
+            if not servidor.encerrar():
+                print("[AVISO] Prazo de encerramento esgotado com consultas em andamento")
+            print(f"[CONCLUÍDO] {servidor.atendidas} consultas atendidas, {servidor.recusadas} recusadas")
+        finally:
+            if consultor.escalonador is not None:
+                consultor.escalonador.encerrar()
+            _finalizar_metricas_perfil(consultor, args)
+            if cache is not None:
+                cache.fechar()
+        return
+
+    if args.grafo_socios:
+        arquivo_saida = args.output or f"grafo_socios_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        expansao = ExpansaoSocietaria(consultor, profundidade_maxima=args.profundidade,
+                                      limite_empresas=args.limite_empresas, concorrencia=args.concorrencia)
+        if base_offline is None:
+            print("[AVISO] A ReceitaWS não informa o documento dos sócios; use --base-offline para "
+                  "seguir sócios pessoa jurídica", file=console)
+        sementes = ler_identificadores(args.batch) if args.batch else [args.identificador]
+        saida = sys.stdout if arquivo_saida == '-' else _abrir_saida(arquivo_saida, args.compressao)
+        colunas = ('origem', 'origem_nome', 'origem_tipo', 'destino', 'destino_nome', 'qualificacao',
+                   'profundidade')
+        try:
+            escritor_csv = csv.writer(saida, lineterminator='\n')
+            escritor_csv.writerow(colunas)
+            for aresta in expansao.arestas(sementes):
+                escritor_csv.writerow([aresta[coluna] for coluna in colunas])
+            print(f"\n[CONCLUÍDO] {expansao.consultadas} empresas consultadas "
+                  f"({expansao.com_erro} com erro), {expansao.arestas_emitidas} arestas", file=console)
+            if expansao.nao_expandidas:
+                print(f"[AVISO] Limite de {args.limite_empresas} empresas atingido: "
+                      f"{expansao.nao_expandidas} ficaram sem consulta", file=console)
+            if arquivo_saida != '-':
+                print(f"[INFO] Arestas salvas em: {arquivo_saida}", file=console)
+        except KeyboardInterrupt:
+            print("\n[INTERROMPIDO] Expansão cancelada pelo usuário", file=console)
+        finally:
+            if saida is not sys.stdout:
+                saida.close()
+            _finalizar_metricas_perfil(consultor, args, arquivo_saida, console)
+            if cache is not None:
+                cache.fechar()
+        return
+
+    if args.batch:
+        arquivo_saida = args.output or f"lote_mr_holmescorp_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+        compacto = args.formato != 'json'
+        diario = None
+        if lote_com_diario:
+            try:
+                diario = DiarioLote(arquivo_saida, args.tipo, retomar=args.resume)
+            except (OSError, ValueError) as e:
+                print(f"[ERRO] Não foi possível abrir o diário do lote: {str(e)}", file=console)
+                sys.exit(1)
+            if args.resume:
+                print(f"[INFO] Retomando {arquivo_saida}: {len(diario.concluidos)} concluídos serão pulados, "
+                      f"{len(diario.falhas)} falhas serão repetidas", file=console)
+        escritor = EscritorRelatorios(arquivo_saida, consultor.catalogos_estaticos() if compacto else None,
+                                      compressao=args.compressao, compacto=compacto, diario=diario)
+        identificadores = ler_identificadores(args.batch)
+        prevalidacao = None
+        if args.tipo in PreValidacaoLote.TAMANHOS and not args.sem_validacao:
+            arquivo_rejeitos = args.rejeitos
+            if arquivo_rejeitos is None and arquivo_saida != '-':
+                arquivo_rejeitos = re.sub(r'(\.jsonl?)?(\.gz|\.zst)?$', '', arquivo_saida) + '.rejeitos.csv'
+            # Pipes e terminais podem ficar sem linhas novas: sem bloco grande, o primeiro item não espera
+            prevalidacao = PreValidacaoLote(args.tipo, arquivo_rejeitos,
+                                            tamanho_bloco=65536 if _entrada_regular(args.batch) else 1)
+            identificadores = prevalidacao.filtrar(identificadores)
+        exportadores = []
+        if args.csv_dir:
+            exportador = ExportadorCSV(args.csv_dir, compressao=args.compressao)
+            exportadores.append(exportador)
+            if args.resume and diario is not None:
+                exportador.reconstruir(diario)
+                print(f"[INFO] Tabelas CSV refeitas a partir de {arquivo_saida}: "
+                      f"{exportador.empresas} empresas", file=console)
+        if limitador is not None and any(fonte.rede for fonte in plano) and args.workers <= 1:
+            consultor.escalonador = EscalonadorHosts(limitador, trabalhadores=args.concorrencia * 2)
+        servidor_metricas = None
+        if args.metrics_porta:
+            servidor_metricas = servir_metricas(consultor.metricas, args.metrics_porta)
+            print(f"[INFO] Métricas em http://127.0.0.1:{args.metrics_porta}/metrics", file=console)
+        try:
+            if args.workers > 1:
+                configuracao = {
+                    "tipo": args.tipo, "concorrencia": args.concorrencia, "tentativas": args.tentativas,
+                    "rede": any(fonte.rede for fonte in plano), "base_offline": args.base_offline,
+                    "consultor": {"timeout": args.timeout_leitura, "timeout_conexao": args.timeout_conexao,
+                                  "atualizar_cache": args.refresh},
+                    "cache": None if cache is None else {"arquivo": cache.arquivo, "ttl": cache.ttl,
+                                                         "max_entradas": cache.max_entradas},
+                    # Cota única para todos os processos (baldes em memória compartilhada)
+                    "cotas": None if limitador is None else limitador.cotas,
+                    "opcoes_busca": {"paralelo": args.paralelo, "timeout_fonte": args.timeout_fonte,
+                                     "timeout_total": args.timeout_total, "fontes": fontes},
+                }
+                print(f"[INFO] {args.workers} processos com {args.concorrencia} consultas cada", file=console)
+                contadores = processar_lote_multiprocesso(
+                    configuracao, identificadores, escritor, args.workers, ordenado=args.ordenado,
+                    concluidos=diario.concluidos if diario is not None else None, exportadores=exportadores)
+            else:
+                contadores = consultor.processar_lote(identificadores, args.tipo, escritor,
+                                                      concorrencia=args.concorrencia, paralelo=args.paralelo,
+                                                      timeout_fonte=args.timeout_fonte,
+                                                      timeout_total=args.timeout_total, fontes=fontes,
+                                                      concluidos=diario.concluidos if diario is not None else None,
+                                                      exportadores=exportadores)
+            print(f"\n[CONCLUÍDO] Lote finalizado: {contadores['processados']} identificadores, "
+                  f"{contadores['com_erro']} com erro", file=console)
+            if contadores['pulados']:
+                print(f"[INFO] {contadores['pulados']} já concluídos em execução anterior", file=console)
+            if prevalidacao is not None:
+                print(f"[INFO] Pré-validação: {prevalidacao.lidos} lidos, {prevalidacao.duplicados} duplicados, "
+                      f"{prevalidacao.rejeitados} inválidos", file=console)
+                if prevalidacao.rejeitados and prevalidacao.arquivo_rejeitos:
+                    print(f"[INFO] Inválidos salvos em: {prevalidacao.arquivo_rejeitos}", file=console)
+            if arquivo_saida != '-':
+                print(f"[INFO] Resultados salvos em: {arquivo_saida}", file=console)
+            if escritor.arquivo_manifesto:
+                print(f"[INFO] Manifesto dos catálogos em: {escritor.arquivo_manifesto}", file=console)
+            for exportador in exportadores:
+                print(f"[INFO] {exportador.empresas} empresas exportadas em CSV para: {exportador.diretorio}",
+                      file=console)
+            if cache is not None:
+                estatisticas = cache.estatisticas()
+                print(f"Cache: {estatisticas['acertos']} acertos, {estatisticas['falhas']} falhas", file=console)
+        except KeyboardInterrupt:
+            print("\n[INTERROMPIDO] Lote cancelado pelo usuário", file=console)
+            if diario is not None:
+                print(f"[INFO] Para continuar: repita o comando com --resume -o {arquivo_saida}", file=console)
+        except Exception as e:
+            print(f"\n[ERRO] Erro durante a execução: {str(e)}", file=console)
+            sys.exit(1)
+        finally:
+            if consultor.escalonador is not None:
+                consultor.escalonador.encerrar()
+            escritor.fechar()
+            for exportador in exportadores:
+                exportador.fechar()
+            if prevalidacao is not None:
+                prevalidacao.fechar()
+            if servidor_metricas is not None:
+                servidor_metricas.shutdown()
+            _finalizar_metricas_perfil(consultor, args, arquivo_saida, console)
+            if cache is not None:
+                cache.fechar()
+        return
+
+    try:
+        formato = args.formato or 'json'
+        if consultor.perfilador is not None:
+            with consultor.perfilador.ativo():
+                resultados = consultor.buscar_completa(args.identificador, args.tipo, paralelo=args.paralelo,
+                                                       timeout_fonte=args.timeout_fonte,
+                                                       timeout_total=args.timeout_total,
+                                                       incluir_catalogos=formato == 'json', fontes=fontes)
+            resultados["perfil"] = consultor.perfilador.relatorio()
+        else:
+            resultados = consultor.buscar_completa(args.identificador, args.tipo, paralelo=args.paralelo,
+                                                   timeout_fonte=args.timeout_fonte,
+                                                   timeout_total=args.timeout_total,
+                                                   incluir_catalogos=formato == 'json', fontes=fontes)
+
+        if args.verbose:
+            print("\n[RESULTADOS DETALHADOS]")
+            print(json.dumps(resultados, ensure_ascii=False, indent=2, default=_serializar_json))
+        else:
+            print("\n[RESUMO DOS RESULTADOS]")
+            for fonte, dados in resultados["fontes"].items():
+                print(f"- {fonte}: {dados.get('status', 'Consultado')}")
+
+        # Salvar relatório
+        consultor.gerar_relatorio(resultados, args.output, formato=formato, compressao=args.compressao)
+        if args.csv_dir:
+            exportador = ExportadorCSV(args.csv_dir, compressao=args.compressao)
+            try:
+                exportador.escrever(resultados)
+            finally:
+                exportador.fechar()
+            print(f"[INFO] Tabelas CSV salvas em: {args.csv_dir}")
+
+        print(f"\n[CONCLUÍDO] Consulta finalizada com sucesso!")
+        print(f"Total de fontes consultadas: {len(resultados['fontes'])}")
+        if cache is not None:
+            estatisticas = cache.estatisticas()
+            print(f"Cache: {estatisticas['acertos']} acertos, {estatisticas['falhas']} falhas")
+
+    except KeyboardInterrupt:
+        print("\n[INTERROMPIDO] Consulta cancelada pelo usuário")
+    except Exception as e:
+        print(f"\n[ERRO] Erro durante a execução: {str(e)}")
+        sys.exit(1)
+    finally:
+        _finalizar_metricas_perfil(consultor, args)
+        if cache is not None:
+            cache.fechar()
+
+
+if __name__ == "__main__":
+    main()
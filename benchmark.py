@@ -0,0 +1,527 @@
+#!/usr/bin/env python3
+"""
+Benchmark do Mr.HolmesCorp contra um servidor local que simula ReceitaWS e BCB
+Autor: Cyberrobot
+
+O servidor roda em um processo separado e injeta latência, HTTP 429, erros
+5xx, JSON malformado e travamentos conforme as taxas configuradas. As
+consultas passam pelo código real de MrHolmesCorp, apontado para o servidor.
+"""
+
+import argparse
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+
+def carregar_mr_holmescorp():
+    """
+    Importa Mr.HolmesCorp.py (o nome do arquivo não é um módulo válido)
+    """
+    if 'mr_holmescorp' in sys.modules:
+        return sys.modules['mr_holmescorp']
+    caminho = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Mr.HolmesCorp.py')
+    spec = importlib.util.spec_from_file_location('mr_holmescorp', caminho)
+    modulo = importlib.util.module_from_spec(spec)
+    sys.modules['mr_holmescorp'] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+class ManipuladorSimulado(BaseHTTPRequestHandler):
+    """
+    Responde como /v1/cnpj/<cnpj> (ReceitaWS) e /rest/valoresAReceber/<doc>/<data> (BCB)
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Cabeçalhos e corpo em um único envio (evita atraso de ACK atrasado do TCP)
+    wbufsize = 64 * 1024
+    config = {}
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _responder(self, status: int, corpo: bytes, cabecalhos: Dict[str, str] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        try:
+            self.wfile.write(corpo)
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Cliente desistiu (timeout) durante um travamento simulado
+            self.close_connection = True
+
+    def do_GET(self) -> None:
+        config = self.config
+        latencia = config['latencia'] / 1000.0
+        if latencia:
+            time.sleep(max(0.0, random.gauss(latencia, latencia * config['jitter'])))
+
+        sorteio = random.random()
+        limite = config['taxa_travamento']
+        if sorteio < limite:
+            time.sleep(config['travamento'])
+            return self._responder(504, b'{}')
+        limite += config['taxa_429']
+        if sorteio < limite:
+            return self._responder(429, b'{"status":"ERROR","message":"Too many requests"}',
+                                   {'Retry-After': str(config['retry_after'])})
+        limite += config['taxa_5xx']
+        if sorteio < limite:
+            return self._responder(random.choice((500, 502, 503)), b'{"status":"ERROR"}')
+        limite += config['taxa_json_invalido']
+        if sorteio < limite:
+            return self._responder(200, b'{"status": "OK", "nome": "EMPRESA')
+
+        if '/v1/cnpj/' in self.path:
+            cnpj = self.path.rsplit('/', 1)[-1]
+            corpo = {
+                "status": "OK",
+                "cnpj": f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}",
+                "nome": f"EMPRESA {cnpj} LTDA",
+                "fantasia": "EMPRESA",
+                "situacao": "ATIVA",
+                "capital_social": "10000.00",
+                "logradouro": "RUA DAS FLORES", "numero": "100", "bairro": "CENTRO",
+                "municipio": "SAO PAULO", "uf": "SP", "cep": "01.001-000",
+                "atividade_principal": [{"code": "62.01-5-01", "text": "Desenvolvimento de software"}],
+                "atividades_secundarias": [{"code": "62.02-3-00", "text": "Licenciamento"}],
+                "qsa": [{"nome": "FULANO DE TAL", "qual": "49-Sócio-Administrador"}]
+            }
+        else:
+            corpo = [{"instituicao": "BANCO EXEMPLO", "valor": 12.34}]
+        self._responder(200, json.dumps(corpo, ensure_ascii=False).encode('utf-8'))
+
+
+def _servir(config: Dict, porta: multiprocessing.Value, pronto: multiprocessing.Event) -> None:
+    ManipuladorSimulado.config = config
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), ManipuladorSimulado)
+    servidor.daemon_threads = True
+    porta.value = servidor.server_address[1]
+    pronto.set()
+    servidor.serve_forever()
+
+
+class ServidorSimulado:
+    """
+    Servidor simulado em processo separado (não contamina o RSS medido)
+    """
+
+    def __init__(self, **config):
+        self.config = config
+        self.porta = None
+        self._processo = None
+
+    def __enter__(self) -> 'ServidorSimulado':
+        porta = multiprocessing.Value('i', 0)
+        pronto = multiprocessing.Event()
+        self._processo = multiprocessing.Process(target=_servir, args=(self.config, porta, pronto), daemon=True)
+        self._processo.start()
+        if not pronto.wait(10):
+            raise RuntimeError("Servidor simulado não iniciou")
+        self.porta = porta.value
+        return self
+
+    def __exit__(self, *args) -> None:
+        self._processo.terminate()
+        self._processo.join()
+
+    def apontar(self, consultor) -> None:
+        """
+        Redireciona as fontes de rede do consultor para o servidor
+
+        ReceitaWS e BCB usam nomes de host distintos para que limitador e
+        escalonador os tratem como hosts separados.
+        """
+        consultor.urls['receitaws_api'] = f"http://localhost:{self.porta}/v1/cnpj/"
+        consultor.urls['bcb_api'] = f"http://127.0.0.1:{self.porta}/publico/rest/valoresAReceber/"
+
+
+def percentil(valores: List[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    posicao = min(len(ordenados) - 1, max(0, int(round(p / 100.0 * len(ordenados) + 0.5)) - 1))
+    return ordenados[posicao]
+
+
+def rss_pico_mb() -> float:
+    # ru_maxrss em KB no Linux e em bytes no macOS
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pico / (1024.0 * 1024.0) if sys.platform == 'darwin' else pico / 1024.0
+
+
+def cnpjs_sinteticos(quantidade: int) -> List[str]:
+    return [f"{11222333 + i:08d}000181" for i in range(quantidade)]
+
+
+def _resumir(nome: str, latencias: List[float], erros: int, duracao: float,
+             rss_mb: Optional[float] = None, quantidade: Optional[int] = None) -> Dict:
+    quantidade = len(latencias) if quantidade is None else quantidade
+    return {
+        "cenario": nome,
+        "consultas": quantidade,
+        "erros": erros,
+        "p50_ms": round(percentil(latencias, 50) * 1000, 2),
+        "p95_ms": round(percentil(latencias, 95) * 1000, 2),
+        "p99_ms": round(percentil(latencias, 99) * 1000, 2),
+        "req_por_segundo": round(quantidade / duracao, 2) if duracao else 0.0,
+        "rss_pico_mb": round(rss_pico_mb() if rss_mb is None else rss_mb, 1)
+    }
+
+
+def _com_erro(resultado: Dict) -> bool:
+    if "fontes" in resultado:
+        return any("erro" in dados for dados in resultado["fontes"].values())
+    return "erro" in resultado
+
+
+def cenario_unica(mrh, servidor: ServidorSimulado, args) -> Dict:
+    """
+    Consultas de CNPJ uma após a outra (buscar_completa sequencial)
+    """
+    consultor = _novo_consultor(mrh, servidor, args)
+    latencias, erros = [], 0
+    inicio = time.perf_counter()
+    for cnpj in cnpjs_sinteticos(args.requisicoes):
+        t0 = time.perf_counter()
+        resultado = consultor.buscar_completa(cnpj, 'cnpj', incluir_catalogos=False)
+        latencias.append(time.perf_counter() - t0)
+        erros += _com_erro(resultado)
+    return _resumir("unica", latencias, erros, time.perf_counter() - inicio)
+
+
+def cenario_concorrente(mrh, servidor: ServidorSimulado, args) -> Dict:
+    """
+    Consultas simultâneas em N threads, cada uma com fan-out paralelo das fontes
+    """
+    consultor = _novo_consultor(mrh, servidor, args)
+    latencias, erros = [], [0]
+    lock = threading.Lock()
+
+    def consultar(cnpj: str) -> None:
+        t0 = time.perf_counter()
+        resultado = consultor.buscar_completa(cnpj, 'cnpj', paralelo=True, incluir_catalogos=False)
+        with lock:
+            latencias.append(time.perf_counter() - t0)
+            erros[0] += _com_erro(resultado)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concorrencia) as executor:
+        list(executor.map(consultar, cnpjs_sinteticos(args.requisicoes)))
+    return _resumir("concorrente", latencias, erros[0], time.perf_counter() - inicio)
+
+
+class _EscritorDescarte:
+    """
+    Escritor de lote que serializa como o EscritorRelatorios e só contabiliza erros (sem E/S de disco)
+    """
+
+    compacto = True
+    referencia_manifesto = None
+
+    def __init__(self):
+        self.erros = 0
+        self._lock = threading.Lock()
+        self._serializar = carregar_mr_holmescorp()._linha_jsonl
+
+    def escrever(self, resultado: Dict) -> None:
+        self._serializar(resultado)
+        with self._lock:
+            self.erros += _com_erro(resultado)
+
+    def escrever_linha(self, linha: str, identificador: str, com_erro: bool) -> None:
+        self.erros += com_erro
+
+
+def cenario_lote(mrh, servidor: ServidorSimulado, args) -> Dict:
+    """
+    processar_lote sobre um gerador de CNPJs, como no modo --batch
+    """
+    consultor = _novo_consultor(mrh, servidor, args)
+    latencias = []
+    lock = threading.Lock()
+    buscar = consultor.buscar_completa
+
+    def buscar_cronometrado(*posicionais, **nomeados):
+        t0 = time.perf_counter()
+        try:
+            return buscar(*posicionais, **nomeados)
+        finally:
+            with lock:
+                latencias.append(time.perf_counter() - t0)
+
+    consultor.buscar_completa = buscar_cronometrado
+    if consultor.limitador is not None:
+        consultor.escalonador = mrh.EscalonadorHosts(consultor.limitador, trabalhadores=args.concorrencia * 2)
+
+    escritor = _EscritorDescarte()
+    inicio = time.perf_counter()
+    try:
+        consultor.processar_lote(iter(cnpjs_sinteticos(args.requisicoes)), 'cnpj', escritor,
+                                 concorrencia=args.concorrencia)
+    finally:
+        if consultor.escalonador is not None:
+            consultor.escalonador.encerrar()
+    return _resumir("lote", latencias, escritor.erros, time.perf_counter() - inicio)
+
+
+def cenario_lote_cache(mrh, servidor: ServidorSimulado, args) -> Dict:
+    """
+    Lote inteiramente atendido pelo cache SQLite em --workers processos (caminho só de CPU)
+
+    Uma primeira passada, fora da medição, aquece um cache temporário. A
+    passada medida usa o limitador padrão do CLI (cotas de ReceitaWS e BCB
+    nos hosts simulados) com o escalonador: acertos de cache não podem
+    gastar cota. Sem latência por consulta, p50/p95/p99 ficam zerados;
+    compare req_por_segundo entre execuções com --workers diferentes.
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix='mrholmescorp-bench-') as diretorio:
+        arquivo_cache = os.path.join(diretorio, 'cache.sqlite3')
+        consultor = mrh.MrHolmesCorp(timeout=args.timeout, silencioso=True,
+                                     cache=mrh.CacheRespostas(arquivo_cache),
+                                     politica=mrh.PoliticaRetentativa(tentativas=args.tentativas))
+        servidor.apontar(consultor)
+        cnpjs = cnpjs_sinteticos(args.requisicoes)
+        consultor.processar_lote(iter(cnpjs), 'cnpj', _EscritorDescarte(), concorrencia=args.concorrencia)
+
+        cotas = {'localhost': mrh.LimitadorTaxa.COTAS_PADRAO['www.receitaws.com.br'],
+                 '127.0.0.1': mrh.LimitadorTaxa.COTAS_PADRAO['valoresareceber.bcb.gov.br']}
+        escritor = _EscritorDescarte()
+        inicio = time.perf_counter()
+        if args.workers > 1:
+            configuracao = {
+                "tipo": 'cnpj', "concorrencia": args.concorrencia, "tentativas": args.tentativas,
+                "rede": True, "base_offline": None, "cotas": cotas,
+                "consultor": {"timeout": args.timeout},
+                "cache": {"arquivo": arquivo_cache},
+                "opcoes_busca": {},
+            }
+            mrh.processar_lote_multiprocesso(configuracao, iter(cnpjs), escritor, args.workers)
+        else:
+            consultor.limitador = mrh.LimitadorTaxa(cotas)
+            consultor.escalonador = mrh.EscalonadorHosts(consultor.limitador,
+                                                         trabalhadores=args.concorrencia * 2)
+            try:
+                consultor.processar_lote(iter(cnpjs), 'cnpj', escritor, concorrencia=args.concorrencia)
+            finally:
+                consultor.escalonador.encerrar()
+        duracao = time.perf_counter() - inicio
+        consultor.cache.fechar()
+    return _resumir(f"lote_cache_{args.workers}p", [], escritor.erros, duracao, quantidade=len(cnpjs))
+
+
+def cenario_inicializacao(mrh, servidor: ServidorSimulado, args) -> Dict:
+    """
+    Processos novos do CLI só com fontes estáticas e --listar-fontes (tempo de partida)
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Mr.HolmesCorp.py')
+    comandos = [
+        ['--tipo', 'placa', 'ABC1234', '-o', os.devnull],
+        ['--tipo', 'nome', 'FULANO DE TAL', '-o', os.devnull],
+        ['--tipo', 'placa', '--listar-fontes']
+    ]
+    latencias, erros = [], 0
+    inicio = time.perf_counter()
+    for i in range(args.execucoes):
+        t0 = time.perf_counter()
+        processo = subprocess.run([sys.executable, script] + comandos[i % len(comandos)],
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        latencias.append(time.perf_counter() - t0)
+        erros += processo.returncode != 0
+    pico = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    pico_mb = pico / (1024.0 * 1024.0) if sys.platform == 'darwin' else pico / 1024.0
+    return _resumir("inicializacao", latencias, erros, time.perf_counter() - inicio, rss_mb=pico_mb)
+
+
+def linhas_documentos(mrh, quantidade: int) -> List[str]:
+    """
+    Entrada suja de lote: CNPJs válidos com e sem pontuação, repetidos e inválidos
+    """
+    gerador = random.Random(42)
+    pesos1, pesos2 = mrh.PESOS_DIGITOS_VERIFICADORES[14]
+    linhas = []
+    for i in range(quantidade):
+        base = f"{gerador.randrange(10 ** 8):08d}0001"
+        dv1 = mrh._digito_verificador(sum(int(d) * p for d, p in zip(base, pesos1)))
+        dv2 = mrh._digito_verificador(sum(int(d) * p for d, p in zip(base + str(dv1), pesos2)))
+        cnpj = f"{base}{dv1}{dv2}"
+        if i % 4 == 1:
+            cnpj = f"{cnpj[:2]}.{cnpj[2:5]}.{cnpj[5:8]}/{cnpj[8:12]}-{cnpj[12:]}"
+        elif i % 4 == 2:
+            cnpj = cnpj[:-1] + str((int(cnpj[-1]) + 1) % 10)
+        elif i % 4 == 3 and linhas:
+            cnpj = linhas[gerador.randrange(len(linhas))]
+        linhas.append(cnpj)
+    return linhas
+
+
+def _cenario_validacao(nome: str, mrh, args, usar_numpy: bool) -> Dict:
+    linhas = linhas_documentos(mrh, args.linhas)
+    prevalidacao = mrh.PreValidacaoLote('cnpj', usar_numpy=usar_numpy)
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(0, len(linhas), prevalidacao.tamanho_bloco):
+        t0 = time.perf_counter()
+        for _ in prevalidacao.filtrar(linhas[i:i + prevalidacao.tamanho_bloco]):
+            pass
+        latencias.append(time.perf_counter() - t0)
+    return _resumir(nome, latencias, prevalidacao.rejeitados, time.perf_counter() - inicio,
+                    quantidade=prevalidacao.lidos)
+
+
+def cenario_validacao(mrh, servidor: ServidorSimulado, args) -> Dict:
+    """
+    Pré-validação de --linhas CNPJs em blocos com NumPy (linhas/s; p50 é o tempo por bloco)
+    """
+    if importlib.util.find_spec('numpy') is None:
+        print("[AVISO] numpy não instalado: validacao mede o caminho sem NumPy", file=sys.stderr)
+        return _cenario_validacao("validacao", mrh, args, usar_numpy=False)
+    return _cenario_validacao("validacao", mrh, args, usar_numpy=True)
+
+
+def cenario_validacao_python(mrh, servidor: ServidorSimulado, args) -> Dict:
+    """
+    A mesma pré-validação sem NumPy, documento a documento
+    """
+    return _cenario_validacao("validacao_python", mrh, args, usar_numpy=False)
+
+
+def _novo_consultor(mrh, servidor: ServidorSimulado, args):
+    limitador = None
+    if args.cota:
+        limitador = mrh.LimitadorTaxa({'localhost': (args.cota, 1), '127.0.0.1': (args.cota, 1)})
+    consultor = mrh.MrHolmesCorp(timeout=args.timeout, silencioso=True, limitador=limitador,
+                                 politica=mrh.PoliticaRetentativa(tentativas=args.tentativas))
+    servidor.apontar(consultor)
+    return consultor
+
+
+CENARIOS: Dict[str, Callable] = {
+    "unica": cenario_unica,
+    "concorrente": cenario_concorrente,
+    "lote": cenario_lote,
+    "lote_cache": cenario_lote_cache,
+    "inicializacao": cenario_inicializacao,
+    "validacao": cenario_validacao,
+    "validacao_python": cenario_validacao_python
+}
+
+
+def _cenario_filho(cenario: Callable, mrh, servidor: ServidorSimulado, args, conexao) -> None:
+    try:
+        conexao.send(cenario(mrh, servidor, args))
+    except BaseException as e:
+        conexao.send(RuntimeError(f"{type(e).__name__}: {e}"))
+    finally:
+        conexao.close()
+
+
+def executar_isolado(cenario: Callable, mrh, servidor: ServidorSimulado, args) -> Dict:
+    """
+    Executa o cenário em um processo filho (fork), para que rss_pico_mb seja o pico só dele
+
+    ru_maxrss é o pico de toda a vida do processo; no mesmo processo, cada
+    cenário herdaria o pico dos anteriores. Sem fork (ex.: Windows), o
+    cenário roda no próprio processo.
+    """
+    if 'fork' not in multiprocessing.get_all_start_methods():
+        return cenario(mrh, servidor, args)
+    contexto = multiprocessing.get_context('fork')
+    leitor, escritor = contexto.Pipe(duplex=False)
+    processo = contexto.Process(target=_cenario_filho, args=(cenario, mrh, servidor, args, escritor))
+    processo.start()
+    escritor.close()
+    try:
+        resultado = leitor.recv()
+    except EOFError:
+        raise RuntimeError(f"Processo do cenário terminou sem resultado (código {processo.exitcode})")
+    finally:
+        processo.join()
+        leitor.close()
+    if isinstance(resultado, BaseException):
+        raise resultado
+    return resultado
+
+
+def imprimir_tabela(resultados: List[Dict]) -> None:
+    colunas = ["cenario", "consultas", "erros", "p50_ms", "p95_ms", "p99_ms", "req_por_segundo", "rss_pico_mb"]
+    larguras = {c: max(len(c), *(len(str(r[c])) for r in resultados)) for c in colunas}
+    print("  ".join(c.ljust(larguras[c]) for c in colunas))
+    for resultado in resultados:
+        print("  ".join(str(resultado[c]).ljust(larguras[c]) for c in colunas))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do Mr.HolmesCorp contra ReceitaWS/BCB simulados')
+    parser.add_argument('--cenarios', default='unica,concorrente,lote,inicializacao,validacao',
+                        help=f"Cenários separados por vírgula ({', '.join(CENARIOS)})")
+    parser.add_argument('--requisicoes', type=int, default=200, help='Consultas de CNPJ por cenário')
+    parser.add_argument('--execucoes', type=int, default=30,
+                        help='Processos do CLI disparados no cenário inicializacao')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processos do cenário lote_cache (como --workers do CLI)')
+    parser.add_argument('--linhas', type=int, default=1000000,
+                        help='CNPJs de entrada nos cenários validacao e validacao_python')
+    parser.add_argument('--concorrencia', type=int, default=8, help='Threads nos cenários concorrente e lote')
+    parser.add_argument('--timeout', type=float, default=2.0, help='Timeout HTTP do consultor (segundos)')
+    parser.add_argument('--tentativas', type=int, default=3,
+                        help='Tentativas por requisição em falhas transitórias (1 desativa as retentativas)')
+    parser.add_argument('--cota', type=float, default=0,
+                        help='Cota por host em req/s (0 desativa o limitador)')
+    parser.add_argument('--latencia', type=float, default=20, help='Latência média do servidor (ms)')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Desvio da latência, fração da média')
+    parser.add_argument('--taxa-429', type=float, default=0.0, help='Fração de respostas HTTP 429')
+    parser.add_argument('--retry-after', type=float, default=1, help='Retry-After enviado com o 429 (segundos)')
+    parser.add_argument('--taxa-5xx', type=float, default=0.0, help='Fração de respostas 5xx')
+    parser.add_argument('--taxa-json-invalido', type=float, default=0.0, help='Fração de respostas com JSON malformado')
+    parser.add_argument('--taxa-travamento', type=float, default=0.0, help='Fração de requisições que travam')
+    parser.add_argument('--travamento', type=float, default=30, help='Duração de um travamento (segundos)')
+    parser.add_argument('--json', metavar='ARQUIVO', help='Salvar os resultados em JSON (linha de base)')
+    args = parser.parse_args()
+
+    nomes = [nome.strip() for nome in args.cenarios.split(',') if nome.strip()]
+    desconhecidos = [nome for nome in nomes if nome not in CENARIOS]
+    if desconhecidos:
+        parser.error(f"cenários desconhecidos: {', '.join(desconhecidos)}")
+
+    mrh = carregar_mr_holmescorp()
+    config = {
+        "latencia": args.latencia, "jitter": args.jitter, "taxa_429": args.taxa_429,
+        "retry_after": args.retry_after, "taxa_5xx": args.taxa_5xx,
+        "taxa_json_invalido": args.taxa_json_invalido, "taxa_travamento": args.taxa_travamento,
+        "travamento": args.travamento
+    }
+
+    resultados = []
+    with ServidorSimulado(**config) as servidor:
+        for nome in nomes:
+            print(f"[INFO] Executando cenário {nome}...", file=sys.stderr)
+            resultados.append(executar_isolado(CENARIOS[nome], mrh, servidor, args))
+
+    imprimir_tabela(resultados)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"configuracao": vars(args), "resultados": resultados}, f, ensure_ascii=False, indent=2)
+        print(f"[INFO] Resultados salvos em: {args.json}")
+
+
+if __name__ == "__main__":
+    main()